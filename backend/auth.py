@@ -1,11 +1,13 @@
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
+from typing import Optional
 import os
-from . import models, database
+import time
+from . import models, database, hashing
 
 
 # Security settings
@@ -13,18 +15,71 @@ SECRET_KEY = os.getenv("SECRET_KEY", "a_very_secret_key_that_should_be_in_env_va
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# How long an authenticated user (and the "do any admins exist" flag) is trusted
+# before it is read from the database again. Role changes invalidate it right away.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+
+# Password hashing. Request handlers should use the async helpers in `hashing`.
+pwd_context = hashing.pwd_context
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/users/login", auto_error=False)
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """The authenticated user, detached from any session so it can be cached."""
+    id: int
+    username: str
+    email: Optional[str]
+    role: str
+
+    @classmethod
+    def from_model(cls, user: models.User) -> "CurrentUser":
+        return cls(id=user.id, username=user.username, email=user.email, role=user.role)
+
+
+_user_cache: dict[int, tuple[float, CurrentUser]] = {}
+_admins_exist: Optional[tuple[float, bool]] = None
+
+def cache_user(user: models.User) -> CurrentUser:
+    if len(_user_cache) >= USER_CACHE_SIZE:
+        _user_cache.clear()
+    current_user = CurrentUser.from_model(user)
+    _user_cache[user.id] = (time.monotonic() + USER_CACHE_TTL, current_user)
+    return current_user
+
+def get_cached_user(user_id: int) -> Optional[CurrentUser]:
+    entry = _user_cache.get(user_id)
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+def invalidate_user(user_id: int):
+    _user_cache.pop(user_id, None)
+
+def admins_exist(db: Session) -> bool:
+    """Whether any admin exists, cached for USER_CACHE_TTL."""
+    global _admins_exist
+    if _admins_exist is None or _admins_exist[0] < time.monotonic():
+        exists = db.query(db.query(models.User).filter(models.User.role == "admin").exists()).scalar()
+        _admins_exist = (time.monotonic() + USER_CACHE_TTL, bool(exists))
+    return _admins_exist[1]
+
+def invalidate_admins_exist():
+    global _admins_exist
+    _admins_exist = None
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def create_access_token_for(user: models.User):
+    # The user id and role travel as claims so requests don't need a username lookup
+    return create_access_token(data={"sub": user.username, "uid": user.id, "role": user.role})
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -59,11 +114,21 @@ def get_current_user(request: Request, db: Session = Depends(database.get_db), t
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        
-        user = db.query(models.User).filter(models.User.username == username).first()
+
+        user_id = payload.get("uid")
+        if user_id is not None:
+            # Hot path: the role is taken from the cache rather than the token claim,
+            # so promotions and demotions apply before the token expires.
+            cached = get_cached_user(user_id)
+            if cached is not None:
+                return cached
+            user = db.get(models.User, user_id)
+        else:
+            # Tokens issued before the uid claim existed
+            user = db.query(models.User).filter(models.User.username == username).first()
         if user is None:
             raise credentials_exception
-        return user
+        return cache_user(user)
     except (JWTError, IndexError, AttributeError):
         # DEV MODE: If token is invalid or not present, return the first user as a default.
         # This allows working on features without needing to be logged in.
@@ -71,9 +136,9 @@ def get_current_user(request: Request, db: Session = Depends(database.get_db), t
         user = db.query(models.User).first()
         if user is None:
             raise HTTPException(status_code=404, detail="Default user not found for dev mode. Please register a user.")
-        return user
+        return cache_user(user)
 
-def require_admin(current_user: models.User = Depends(get_current_user)):
+def require_admin(current_user: CurrentUser = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -81,14 +146,13 @@ def require_admin(current_user: models.User = Depends(get_current_user)):
         )
     return current_user
 
-def require_admin_or_no_admins_exist(current_user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
+def require_admin_or_no_admins_exist(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(database.get_db)):
     """
     Dependency that requires the current user to be an admin,
     OR for there to be no admins in the system yet.
     This allows the first user to be promoted.
     """
-    admin_count = db.query(models.User).filter(models.User.role == "admin").count()
-    if admin_count > 0 and current_user.role != "admin":
+    if current_user.role != "admin" and admins_exist(db):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to perform this action.",
@@ -0,0 +1,110 @@
+"""
+1v1 battle engine.
+
+A battle is a seeded RNG plus a list of turn events. Each event is an
+(attacker, damage, defender_hp) record, where attacker is 0 for the first
+Pokémon and 1 for the second, and defender_hp is the defender's remaining HP
+(never below 0). Events are stored packed with `pack_events`; the English
+battle log is only rendered from them with `render_log` when it is needed.
+"""
+import random
+import struct
+
+# attacker (uint8), damage (uint16), defender remaining hp (uint16)
+EVENT = struct.Struct("<BHH")
+
+
+def new_seed() -> int:
+    return random.getrandbits(31)
+
+
+def first_attacker(p1_stats: dict, p2_stats: dict) -> int:
+    """Index of the Pokémon that attacks first. The faster one, ties go to the first."""
+    return 0 if p1_stats["speed"] >= p2_stats["speed"] else 1
+
+
+def iter_battle(p1_stats: dict, p2_stats: dict, seed: int):
+    """
+    Yield the turn events of a battle as they are played. `p1_stats` and
+    `p2_stats` are updated in place with the remaining HP.
+    """
+    rng = random.Random(seed)
+    fighters = (p1_stats, p2_stats)
+    attacker = first_attacker(p1_stats, p2_stats)
+
+    while p1_stats["hp"] > 0 and p2_stats["hp"] > 0:
+        defender = 1 - attacker
+        damage = max(1, round((fighters[attacker]["attack"] / fighters[defender]["defense"]) * 10 * (rng.uniform(0.9, 1.1))))
+        fighters[defender]["hp"] -= damage
+        yield (attacker, damage, max(0, fighters[defender]["hp"]))
+
+        if fighters[defender]["hp"] <= 0:
+            break
+
+        # Swap roles
+        attacker = defender
+
+
+def play_battle(p1_stats: dict, p2_stats: dict, seed: int):
+    """
+    Play a 1v1 battle. `p1_stats` and `p2_stats` are updated in place with the
+    remaining HP. Returns (winner_index, events).
+    """
+    first = first_attacker(p1_stats, p2_stats)
+    events = list(iter_battle(p1_stats, p2_stats, seed))
+    return (events[-1][0] if events else first), events
+
+
+def render_turn(names: tuple[str, str], event: tuple[int, int, int]) -> list[str]:
+    """The log lines of one turn event."""
+    attacker, damage, defender_hp = event
+    attacker_name, defender_name = names[attacker], names[1 - attacker]
+    lines = [
+        f"{attacker_name} attacks {defender_name} for {damage} damage.",
+        f"{defender_name} has {defender_hp} HP remaining.",
+    ]
+    if defender_hp == 0:
+        lines.append(f"{defender_name} fainted. {attacker_name} wins!")
+    return lines
+
+
+def replay(p1_stats: dict, p2_stats: dict, seed: int):
+    """Re-run a battle from its initial stats and seed. Returns (winner_index, events)."""
+    return play_battle(dict(p1_stats), dict(p2_stats), seed)
+
+
+def play_many(matches: list[tuple[dict, dict, int]]) -> list[tuple[int, bytes]]:
+    """
+    Play (p1_stats, p2_stats, seed) battles without touching the given stats.
+    Returns (winner_index, packed events) per battle. Module level so worker processes can run it.
+    """
+    results = []
+    for p1_stats, p2_stats, seed in matches:
+        winner, events = replay(p1_stats, p2_stats, seed)
+        results.append((winner, pack_events(events)))
+    return results
+
+
+def pack_events(events: list[tuple[int, int, int]]) -> bytes:
+    return b"".join(EVENT.pack(*event) for event in events)
+
+
+def unpack_events(data: bytes) -> list[tuple[int, int, int]]:
+    return list(EVENT.iter_unpack(data))
+
+
+def render_intro(p1_stats: dict, p2_stats: dict) -> list[str]:
+    names = (p1_stats["name"], p2_stats["name"])
+    return [
+        f"Battle starts between {names[0]} and {names[1]}!",
+        f"{names[first_attacker(p1_stats, p2_stats)]} is faster and attacks first.",
+    ]
+
+
+def render_log(p1_stats: dict, p2_stats: dict, events: list[tuple[int, int, int]]) -> list[str]:
+    """Render the human-readable battle log from the initial stats and the turn events."""
+    names = (p1_stats["name"], p2_stats["name"])
+    battle_log = render_intro(p1_stats, p2_stats)
+    for event in events:
+        battle_log.extend(render_turn(names, event))
+    return battle_log
@@ -0,0 +1,92 @@
+"""
+Battle log responses encoded with orjson, splicing in the JSON stored with each battle.
+
+The stats of both Pokémon are stored as JSON text. The responses here write
+that text into the body as it is, instead of parsing it, validating it into
+the response schema and encoding it again with the stdlib encoder. The other
+fields are encoded with orjson. The output matches the schemas in
+`schemas.py`, which still document these routes.
+
+Only rows with packed `events` are trusted to hold valid JSON, since they were
+written by `json.dumps`. Older rows are parsed first, leniently, the way the
+schema validators did it.
+"""
+import json
+from typing import Any, Iterable
+
+import orjson
+from fastapi.responses import Response
+
+from backend import battle_engine, models
+
+# Pydantic writes UTC as "Z", keep the same timestamps
+OPTIONS = orjson.OPT_UTC_Z
+STATS_FIELDS = ("pokemon1_stats", "pokemon2_stats")
+
+
+class RawJSONResponse(Response):
+    """A response whose content is already encoded JSON."""
+    media_type = "application/json"
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=OPTIONS)
+
+
+def splice(fields: dict, raw: dict[str, str]) -> bytes:
+    """`fields` as a JSON object, with the `raw` members appended. Their values are JSON text and are written as is."""
+    encoded = dumps(fields)
+    members = b",".join(dumps(name) + b":" + value.encode() for name, value in raw.items())
+    if not members:
+        return encoded
+    return encoded[:-1] + (b"," if fields else b"") + members + b"}"
+
+
+def _legacy_stats(value: str) -> dict:
+    try:
+        return json.loads(value)
+    except (TypeError, json.JSONDecodeError):
+        return {}
+
+
+def battle_summaries(battles: Iterable[models.BattleLog]) -> bytes:
+    """The battle history page, as `schemas.BattleLogSummary` items."""
+    return dumps([
+        {
+            "id": battle.id,
+            "pokemon1_name": battle.pokemon1_name,
+            "pokemon2_name": battle.pokemon2_name,
+            "winner_name": battle.winner_name,
+            "timestamp": battle.timestamp,
+        }
+        for battle in battles
+    ])
+
+
+def battle_details(battle: models.BattleLog) -> bytes:
+    """A saved battle as `schemas.BattleLogDetails`."""
+    fields = {
+        "pokemon1_name": battle.pokemon1_name,
+        "pokemon2_name": battle.pokemon2_name,
+        "winner_name": battle.winner_name,
+        "log": None,
+        "id": battle.id,
+        "timestamp": battle.timestamp,
+    }
+    if battle.events is None:
+        # Saved before `events`: the log is stored as JSON too, but none of it is trusted
+        fields["log"] = json.loads(battle.log_json or "[]")
+        return dumps({**fields, **{name: _legacy_stats(getattr(battle, name)) for name in STATS_FIELDS}})
+    # Rendering the log needs the names and speeds, the stats are still written from the stored text
+    fields["log"] = battle_engine.render_log(
+        json.loads(battle.pokemon1_stats),
+        json.loads(battle.pokemon2_stats),
+        battle_engine.unpack_events(battle.events),
+    )
+    return splice(fields, {name: getattr(battle, name) for name in STATS_FIELDS})
+
+
+def battle_events(battle: models.BattleLog) -> bytes:
+    """The compact form of a battle with packed events, as `schemas.BattleEvents`."""
+    fields = {"id": battle.id, "seed": battle.seed, "events": battle_engine.unpack_events(battle.events)}
+    return splice(fields, {name: getattr(battle, name) for name in STATS_FIELDS})
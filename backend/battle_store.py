@@ -0,0 +1,144 @@
+"""
+Persistence of battle logs.
+
+Battle logs are written with one bulk INSERT ... RETURNING per transaction.
+With BATTLE_LOG_WRITE_BEHIND=1, inserts from concurrent requests are queued
+and grouped into one transaction every BATTLE_LOG_FLUSH_INTERVAL_MS, so many
+battles share a single commit (and fsync). Callers still wait for their rows
+to be committed and get their ids and timestamps back.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import models, database, leaderboard
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND = os.getenv("BATTLE_LOG_WRITE_BEHIND", "0") == "1"
+FLUSH_INTERVAL_MS = float(os.getenv("BATTLE_LOG_FLUSH_INTERVAL_MS", 20))
+MAX_BATCH = int(os.getenv("BATTLE_LOG_MAX_BATCH", 500))
+QUEUE_SIZE = int(os.getenv("BATTLE_LOG_QUEUE_SIZE", 10000))
+
+
+async def insert_battle_logs(db: AsyncSession, rows: list[dict]) -> list[tuple[int, datetime]]:
+    """
+    Bulk insert battle logs and update the leaderboard counters, without committing.
+    Returns (id, timestamp) per row, in order.
+    """
+    stmt = insert(models.BattleLog).returning(
+        models.BattleLog.id, models.BattleLog.timestamp, sort_by_parameter_order=True
+    )
+    saved = [(r.id, r.timestamp) for r in await db.execute(stmt, rows)]
+    await leaderboard.record_battles(db, rows)
+    return saved
+
+
+class BattleLogWriter:
+    """Groups battle log inserts from many requests into periodic transactions."""
+
+    def __init__(self, flush_interval: float, max_batch: int, queue_size: int):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything queued, then stop."""
+        await self._queue.join()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def submit(self, rows: list[dict]) -> list[tuple[int, datetime]]:
+        """Queue `rows` to be saved together, and wait until they are committed."""
+        future = asyncio.get_running_loop().create_future()
+        # Waits when the queue is full, which slows down producers
+        await self._queue.put((rows, future))
+        return await future
+
+    async def _next_batch(self) -> list[tuple[list[dict], asyncio.Future]]:
+        batch = [await self._queue.get()]
+        size = len(batch[0][0])
+        # Let other requests join this transaction
+        await asyncio.sleep(self.flush_interval)
+        while size < self.max_batch and not self._queue.empty():
+            item = self._queue.get_nowait()
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                async with database.AsyncSessionLocal() as db:
+                    saved = await insert_battle_logs(db, [row for rows, _ in batch for row in rows])
+                    await db.commit()
+            except Exception as e:
+                logger.exception("Failed to write %d battle log batches", len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                start = 0
+                for rows, future in batch:
+                    if not future.done():
+                        future.set_result(saved[start:start + len(rows)])
+                    start += len(rows)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+_writer: Optional[BattleLogWriter] = None
+
+
+def start():
+    global _writer
+    if WRITE_BEHIND:
+        _writer = BattleLogWriter(FLUSH_INTERVAL_MS / 1000, MAX_BATCH, QUEUE_SIZE)
+        _writer.start()
+
+
+async def stop():
+    global _writer
+    if _writer is not None:
+        await _writer.stop()
+        _writer = None
+
+
+async def save_battle_logs(db: AsyncSession, rows: list[dict]) -> list[tuple[int, datetime]]:
+    """
+    Save battle logs in a single transaction, through the write-behind queue when
+    it is enabled. Returns (id, timestamp) per row, in order.
+    """
+    if _writer is not None:
+        # Give the request's connection back to the pool while the writer works,
+        # or many waiting requests could hold every connection the writer needs.
+        await db.close()
+        return await _writer.submit(rows)
+    saved = await insert_battle_logs(db, rows)
+    await db.commit()
+    return saved
+
+
+async def save_tournament(db: AsyncSession, tournament: dict, rows: list[dict]) -> tuple[int, datetime, list[tuple[int, datetime]]]:
+    """
+    Save a tournament and all of its battle logs in one transaction, outside the
+    write-behind queue since it is already a single bulk write.
+    Returns (tournament id, tournament timestamp, (id, timestamp) per battle row).
+    """
+    stmt = insert(models.Tournament).returning(models.Tournament.id, models.Tournament.timestamp)
+    tournament_id, timestamp = (await db.execute(stmt, tournament)).one()
+    saved = await insert_battle_logs(db, [{**row, "tournament_id": tournament_id} for row in rows])
+    await db.commit()
+    return tournament_id, timestamp, saved
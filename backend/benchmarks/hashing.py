@@ -0,0 +1,52 @@
+"""
+Login throughput of the hashing process pool at increasing worker counts.
+
+    python -m backend.benchmarks.hashing [--logins 64] [--rounds 12]
+
+Each simulated login is one bcrypt verification submitted through
+`hashing.verify_password`, all submitted at once. Throughput should grow
+roughly linearly with workers up to the number of cores.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from backend import hashing
+
+
+async def run_logins(count: int, hashed_password: str) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(*[hashing.verify_password("hunter2", hashed_password) for _ in range(count)])
+    elapsed = time.perf_counter() - start
+    assert all(valid for valid, _ in results)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m backend.benchmarks.hashing")
+    parser.add_argument("--logins", type=int, default=64, help="Logins per run.")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    hashed_password = hashing.pwd_context.hash("hunter2")
+    hashing.HASH_QUEUE_DEPTH = args.logins
+
+    print(f"bcrypt rounds={hashing.BCRYPT_ROUNDS}, {args.logins} logins per run")
+    print(f"{'workers':>7}  {'logins/s':>9}  {'speedup':>7}")
+    baseline = None
+    # 1, 2, 4, ... up to and including max_workers
+    worker_counts = sorted({min(2 ** i, args.max_workers) for i in range(args.max_workers.bit_length() + 1)})
+    for workers in worker_counts:
+        hashing.HASH_WORKERS = workers
+        hashing.shutdown()
+        # Warm the pool so process start-up isn't measured
+        asyncio.run(run_logins(workers, hashed_password))
+        throughput = args.logins / asyncio.run(run_logins(args.logins, hashed_password))
+        baseline = baseline or throughput
+        print(f"{workers:>7}  {throughput:>9.1f}  {throughput / baseline:>6.2f}x")
+    hashing.shutdown()
+
+
+if __name__ == "__main__":
+    main()
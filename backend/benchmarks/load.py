@@ -0,0 +1,279 @@
+"""
+Load and latency benchmark of the API against a local PokeAPI stand-in.
+
+    python -m backend.benchmarks.load [--scenarios pokedex,battle] [--concurrency 1,8,32]
+                                      [--requests 400] [--snapshot] [--output results.jsonl]
+
+The app runs in-process on a fresh SQLite database in a temporary directory,
+seeded with users, teams and battle logs, and PokeAPI is replaced by
+`stub_pokeapi`, so nothing leaves the machine. Each scenario is run at each
+concurrency level by that many clients sending requests back to back. The
+report gives throughput, p50/p95/p99 latency and database queries per
+request. With --output, every run is appended as one JSON line, to compare
+results over time.
+
+Scenarios:
+    pokedex   GET /api/pokemon/ (pages through the list)
+    pokemon   GET /api/pokemon/{name}
+    history   GET /api/battle/
+    battle    POST /api/battle/
+    team      POST /api/team/{id}/add and DELETE /api/team/{id}/remove/{name}, alternating
+    login     POST /api/users/login
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+
+import httpx
+import numpy as np
+
+SCENARIOS = ["pokedex", "pokemon", "history", "battle", "team", "login"]
+PASSWORD = "benchmark"
+ROSTER_SIZE = 5 # The sixth slot is used by the team scenario
+
+
+@dataclass
+class BenchUser:
+    id: int
+    username: str
+    token: str
+    team_id: int
+    roster: list[str]
+    extra: str # Added to and removed from the team by the team scenario
+    extra_added: bool = False
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+def configure(args):
+    """Point the app at a throwaway database and the stub PokeAPI. Must run before the app is imported."""
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(args.workdir, 'benchmark.db')}"
+    os.environ["POKEAPI_URL"] = "http://pokeapi.stub"
+    os.environ["POKEAPI_CACHE_DIR"] = os.path.join(args.workdir, "pokeapi_cache")
+    if args.bcrypt_rounds:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+
+def seed(users: int, battles_per_user: int, with_snapshot: bool) -> list[BenchUser]:
+    """Create admin users with one team each and a battle history, and return them."""
+    from sqlalchemy import insert
+    from backend import models, database, auth, hashing, battle_engine, leaderboard, snapshot
+    from backend.benchmarks import stub_pokeapi
+
+    names = stub_pokeapi.NAMES
+    records = {name: snapshot.record_from_payload(stub_pokeapi.payload(name)) for name in names}
+    stats = {
+        name: {"name": name.capitalize(), **{k: r["stats"][k] for k in ("hp", "attack", "defense", "speed")}, "types": r["types"], "id": r["id"]}
+        for name, r in records.items()
+    }
+
+    db = database.SessionLocal()
+    try:
+        if with_snapshot:
+            snapshot.save(db, list(records.values()))
+        pokemons = {name: models.Pokemon(name=name, image=records[name]["image"]) for name in names}
+        db.add_all(pokemons.values())
+        hashed_password = hashing.pwd_context.hash(PASSWORD)
+        created = []
+        for i in range(users):
+            user = models.User(username=f"bench{i}", hashed_password=hashed_password, role="admin")
+            roster = [names[(i + k) % len(names)] for k in range(ROSTER_SIZE)]
+            team = models.Team(name=f"Team {i}", user=user, pokemons=[pokemons[name] for name in roster])
+            db.add_all([user, team])
+            created.append((user, team, roster))
+        db.commit()
+
+        rows = []
+        for user, _, roster in created:
+            for k in range(battles_per_user):
+                p1, p2 = stats[roster[k % len(roster)]], stats[roster[(k + 1) % len(roster)]]
+                seed = battle_engine.new_seed()
+                winner, events = battle_engine.replay(p1, p2, seed)
+                rows.append({
+                    "pokemon1_name": p1["name"],
+                    "pokemon2_name": p2["name"],
+                    "winner_name": (p1, p2)[winner]["name"],
+                    "events": battle_engine.pack_events(events),
+                    "seed": seed,
+                    "pokemon1_stats": json.dumps(p1, separators=(",", ":")),
+                    "pokemon2_stats": json.dumps(p2, separators=(",", ":")),
+                    "user_id": user.id,
+                })
+        if rows:
+            db.execute(insert(models.BattleLog), rows)
+            db.commit()
+            leaderboard.rebuild(db)
+
+        return [
+            BenchUser(
+                id=user.id,
+                username=user.username,
+                token=auth.create_access_token_for(user),
+                team_id=team.id,
+                roster=roster,
+                extra=names[(i + ROSTER_SIZE) % len(names)],
+            )
+            for i, (user, team, roster) in enumerate(created)
+        ]
+    finally:
+        db.close()
+
+
+async def request(scenario: str, client: httpx.AsyncClient, user: BenchUser, n: int) -> httpx.Response:
+    """The n-th request a client sends in a scenario."""
+    if scenario == "pokedex":
+        return await client.get("/api/pokemon/", params={"limit": 20, "offset": (n * 20) % 100})
+    if scenario == "pokemon":
+        return await client.get(f"/api/pokemon/{user.roster[n % len(user.roster)]}")
+    if scenario == "history":
+        return await client.get("/api/battle/", params={"limit": 50}, headers=user.headers)
+    if scenario == "battle":
+        pair = [user.roster[n % len(user.roster)], user.roster[(n + 1) % len(user.roster)]]
+        return await client.post("/api/battle/", json=pair, headers=user.headers)
+    if scenario == "team":
+        if user.extra_added:
+            response = await client.delete(f"/api/team/{user.team_id}/remove/{user.extra}", headers=user.headers)
+        else:
+            response = await client.post(f"/api/team/{user.team_id}/add", json={"name": user.extra, "image": ""}, headers=user.headers)
+        if response.is_success:
+            user.extra_added = not user.extra_added
+        return response
+    if scenario == "login":
+        return await client.post("/api/users/login", data={"username": user.username, "password": PASSWORD})
+    raise ValueError(f"Unknown scenario {scenario!r}")
+
+
+class QueryCounter:
+    """Counts statements sent to the database, from both the sync and the async engine."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+async def run(scenario: str, client: httpx.AsyncClient, users: list[BenchUser], concurrency: int, total: int, queries: QueryCounter) -> dict:
+    """Send `total` requests from `concurrency` clients and measure them."""
+    latencies = []
+    statuses: dict[int, int] = {}
+    sent = itertools.count()
+
+    async def client_loop(user: BenchUser):
+        for n in itertools.count():
+            if next(sent) >= total:
+                return
+            start = time.perf_counter()
+            response = await request(scenario, client, user, n)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    # One unmeasured request per client, so caches and pools are warm
+    await asyncio.gather(*[request(scenario, client, user, 0) for user in users[:concurrency]])
+    queries.count = 0
+    start = time.perf_counter()
+    await asyncio.gather(*[client_loop(user) for user in users[:concurrency]])
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": statuses,
+        "throughput": total / elapsed,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "queries_per_request": queries.count / total,
+    }
+
+
+async def run_all(args, users: list[BenchUser]) -> list[dict]:
+    from sqlalchemy import event
+    from backend import database, pokeapi
+    from backend.main import app
+    from backend.benchmarks import stub_pokeapi
+
+    queries = QueryCounter()
+    event.listen(database.engine, "before_cursor_execute", queries)
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", queries)
+
+    results = []
+    async with app.router.lifespan_context(app):
+        # Replace the upstream client the lifespan created with one bound to the stub
+        await pokeapi.startup(httpx.ASGITransport(app=stub_pokeapi.app))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+            for scenario in args.scenarios:
+                for concurrency in args.concurrency:
+                    result = await run(scenario, client, users, concurrency, args.requests, queries)
+                    print_result(result)
+                    results.append(result)
+    return results
+
+
+def print_result(result: dict):
+    print(
+        f"{result['scenario']:<8} {result['concurrency']:>5} {result['requests']:>6} {result['errors']:>6} "
+        f"{result['throughput']:>9.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+        f"{result['queries_per_request']:>8.2f}"
+    )
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m backend.benchmarks.load")
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=SCENARIOS, help="Comma separated, default: all.")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32], help="Comma separated client counts.")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per scenario and concurrency level.")
+    parser.add_argument("--battles", type=int, default=200, help="Battle logs seeded per user.")
+    parser.add_argument("--snapshot", action="store_true", help="Serve species from an imported snapshot instead of the stub PokeAPI.")
+    parser.add_argument("--bcrypt-rounds", type=int, help="Override BCRYPT_ROUNDS, which sets the cost of logins.")
+    parser.add_argument("--database-url", help="Database to seed and use instead of a temporary SQLite file. Must be empty.")
+    parser.add_argument("--output", help="Append the results to this file as one JSON line.")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        args.workdir = workdir
+        configure(args)
+        from backend import models, database, migrations, hashing
+        models.Base.metadata.create_all(bind=database.engine)
+        migrations.upgrade(database.engine)
+        users = seed(max(args.concurrency), args.battles, args.snapshot)
+
+        print(f"{len(users)} users, {args.battles} battles each, species from {'snapshot' if args.snapshot else 'stub PokeAPI'}, bcrypt rounds={hashing.BCRYPT_ROUNDS}")
+        print(f"{'scenario':<8} {'conc':>5} {'reqs':>6} {'errors':>6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+        results = asyncio.run(run_all(args, users))
+        database.engine.dispose()
+
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "revision": git_revision(),
+                "snapshot": args.snapshot,
+                "bcrypt_rounds": hashing.BCRYPT_ROUNDS,
+                "results": results,
+            }) + "\n")
+
+
+if __name__ == "__main__":
+    main()
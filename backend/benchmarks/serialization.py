@@ -0,0 +1,101 @@
+"""
+Serialization cost per request of the battle log routes, schema path against `battle_json`.
+
+    python -m backend.benchmarks.serialization [--turns 50,500,5000] [--page 200] [--repeat 200]
+
+The schema path is what FastAPI does with a `response_model`: validate the
+ORM row into the schema (parsing the stored JSON), dump it to JSON-able
+Python and encode that with the stdlib encoder. The raw path is
+`battle_json`, which splices the stored JSON into bytes encoded by orjson.
+Battles of the requested lengths are played in memory with tanky stats, so no
+database is needed and only serialization is measured.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+from pydantic import TypeAdapter
+
+from backend import battle_engine, battle_json, models, schemas
+
+
+def make_battle(battle_id: int, turns: int, legacy: bool = False) -> models.BattleLog:
+    """A battle log row of about `turns` turns, with packed events, or with a JSON log when `legacy`."""
+    # Damage is about 10 * attack / defense per hit, so HP sets the length
+    hp = max(1, turns * 5)
+    p1 = {"name": "Snorlax", "hp": hp, "attack": 100, "defense": 100, "speed": 30, "types": ["normal"], "id": 143}
+    p2 = {"name": "Blissey", "hp": hp, "attack": 100, "defense": 100, "speed": 55, "types": ["normal"], "id": 242}
+    seed = battle_id
+    winner, events = battle_engine.replay(p1, p2, seed)
+    battle = models.BattleLog(
+        id=battle_id,
+        pokemon1_name=p1["name"],
+        pokemon2_name=p2["name"],
+        winner_name=(p1, p2)[winner]["name"],
+        seed=seed,
+        pokemon1_stats=json.dumps(p1, separators=(",", ":")),
+        pokemon2_stats=json.dumps(p2, separators=(",", ":")),
+        timestamp=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+    if legacy:
+        battle.log_json = json.dumps(battle_engine.render_log(p1, p2, events))
+    else:
+        battle.events = battle_engine.pack_events(events)
+    return battle
+
+
+def schema_path(adapter: TypeAdapter, content) -> bytes:
+    """Validate, dump and encode like FastAPI's response_model and JSONResponse."""
+    validated = adapter.validate_python(content, from_attributes=True)
+    return json.dumps(
+        adapter.dump_python(validated, mode="json"), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def measure(function, repeat: int) -> tuple[float, int]:
+    """Median microseconds per call and the size of the output."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = function()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1e6, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m backend.benchmarks.serialization")
+    parser.add_argument("--turns", type=lambda s: [int(t) for t in s.split(",")], default=[50, 500, 5000], help="Comma separated battle lengths.")
+    parser.add_argument("--page", type=int, default=200, help="Battles in the history page.")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls timed per case.")
+    args = parser.parse_args()
+
+    details = TypeAdapter(schemas.BattleLogDetails)
+    events = TypeAdapter(schemas.BattleEvents)
+    summaries = TypeAdapter(list[schemas.BattleLogSummary])
+    cases = []
+    for turns in args.turns:
+        battle = make_battle(1, turns)
+        legacy = make_battle(1, turns, legacy=True)
+        cases += [
+            (f"details, {turns} turns", lambda b=battle: schema_path(details, b), lambda b=battle: battle_json.battle_details(b)),
+            (f"details (legacy log), {turns} turns", lambda b=legacy: schema_path(details, b), lambda b=legacy: battle_json.battle_details(b)),
+            (f"events, {turns} turns", lambda b=battle: schema_path(events, {
+                "id": b.id, "seed": b.seed, "pokemon1_stats": b.pokemon1_stats, "pokemon2_stats": b.pokemon2_stats,
+                "events": battle_engine.unpack_events(b.events),
+            }), lambda b=battle: battle_json.battle_events(b)),
+        ]
+    page = [make_battle(i, 10) for i in range(args.page)]
+    cases.append((f"history, {args.page} battles", lambda: schema_path(summaries, page), lambda: battle_json.battle_summaries(page)))
+
+    print(f"median of {args.repeat} calls")
+    print(f"{'case':<36} {'bytes':>9} {'schema us':>10} {'raw us':>9} {'speedup':>8}")
+    for name, schema, raw in cases:
+        schema_us, size = measure(schema, args.repeat)
+        raw_us, _ = measure(raw, args.repeat)
+        print(f"{name:<36} {size:>9} {schema_us:>10.1f} {raw_us:>9.1f} {schema_us / raw_us:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
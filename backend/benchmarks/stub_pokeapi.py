@@ -0,0 +1,113 @@
+"""
+A local stand-in for PokeAPI with canned species payloads.
+
+Serves the two endpoints the backend uses, /pokemon?limit=&offset= and
+/pokemon/{name or id}, in the same shape as PokeAPI, plus placeholder sprites
+under /sprites/pokemon. The benchmarks mount it in-process; it can also be run
+on its own and pointed at with POKEAPI_URL and SPRITE_ORIGIN:
+
+    uvicorn backend.benchmarks.stub_pokeapi:app --port 8001
+    POKEAPI_URL=http://localhost:8001 SPRITE_ORIGIN=http://localhost:8001/sprites/pokemon uvicorn backend.main:app
+"""
+import io
+
+from fastapi import FastAPI, HTTPException, Response
+from PIL import Image
+
+# name: (id, types, (hp, attack, defense, special-attack, special-defense, speed))
+SPECIES = {
+    "bulbasaur": (1, ["grass", "poison"], (45, 49, 49, 65, 65, 45)),
+    "ivysaur": (2, ["grass", "poison"], (60, 62, 63, 80, 80, 60)),
+    "venusaur": (3, ["grass", "poison"], (80, 82, 83, 100, 100, 80)),
+    "charmander": (4, ["fire"], (39, 52, 43, 60, 50, 65)),
+    "charmeleon": (5, ["fire"], (58, 64, 58, 80, 65, 80)),
+    "charizard": (6, ["fire", "flying"], (78, 84, 78, 109, 85, 100)),
+    "squirtle": (7, ["water"], (44, 48, 65, 50, 64, 43)),
+    "wartortle": (8, ["water"], (59, 63, 80, 65, 80, 58)),
+    "blastoise": (9, ["water"], (79, 83, 100, 85, 105, 78)),
+    "pikachu": (25, ["electric"], (35, 55, 40, 50, 50, 90)),
+    "raichu": (26, ["electric"], (60, 90, 55, 90, 80, 110)),
+    "clefairy": (35, ["fairy"], (70, 45, 48, 60, 65, 35)),
+    "jigglypuff": (39, ["normal", "fairy"], (115, 45, 20, 45, 25, 20)),
+    "machop": (66, ["fighting"], (70, 80, 50, 35, 35, 35)),
+    "geodude": (74, ["rock", "ground"], (40, 80, 100, 30, 30, 20)),
+    "gastly": (92, ["ghost", "poison"], (30, 35, 30, 100, 35, 80)),
+    "gengar": (94, ["ghost", "poison"], (60, 65, 60, 130, 75, 110)),
+    "onix": (95, ["rock", "ground"], (35, 45, 160, 30, 45, 70)),
+    "eevee": (133, ["normal"], (55, 55, 50, 45, 65, 55)),
+    "jolteon": (135, ["electric"], (65, 65, 60, 110, 95, 130)),
+    "snorlax": (143, ["normal"], (160, 110, 65, 65, 110, 30)),
+    "dragonite": (149, ["dragon", "flying"], (91, 134, 95, 100, 100, 80)),
+    "mewtwo": (150, ["psychic"], (106, 110, 90, 154, 90, 130)),
+    "scizor": (212, ["bug", "steel"], (70, 130, 100, 55, 80, 65)),
+    "tyranitar": (248, ["rock", "dark"], (100, 134, 110, 95, 100, 61)),
+    "lucario": (448, ["fighting", "steel"], (70, 110, 70, 115, 70, 90)),
+}
+STAT_NAMES = ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+BASE_URL = "https://pokeapi.co/api/v2"
+SPRITES_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon"
+
+NAMES = sorted(SPECIES, key=lambda name: SPECIES[name][0])
+BY_ID = {poke_id: name for name, (poke_id, _, _) in SPECIES.items()}
+
+
+def payload(name: str) -> dict:
+    """A /pokemon/{name} payload with the fields the backend reads."""
+    poke_id, types, stats = SPECIES[name]
+    return {
+        "id": poke_id,
+        "name": name,
+        "height": 10,
+        "weight": 100,
+        "types": [{"slot": slot, "type": {"name": t}} for slot, t in enumerate(types, start=1)],
+        "stats": [{"base_stat": value, "stat": {"name": stat}} for stat, value in zip(STAT_NAMES, stats)],
+        "sprites": {
+            "front_default": f"{SPRITES_URL}/{poke_id}.png",
+            "other": {"official-artwork": {"front_default": f"{SPRITES_URL}/other/official-artwork/{poke_id}.png"}},
+        },
+    }
+
+
+app = FastAPI(title="PokeAPI stub")
+
+
+@app.get("/pokemon")
+@app.get("/pokemon/")
+def list_pokemon(limit: int = 20, offset: int = 0):
+    return {
+        "count": len(NAMES),
+        "results": [
+            {"name": name, "url": f"{BASE_URL}/pokemon/{SPECIES[name][0]}/"}
+            for name in NAMES[offset:offset + limit]
+        ],
+    }
+
+
+@app.get("/pokemon/{name}")
+def get_pokemon(name: str):
+    name = BY_ID.get(int(name), name) if name.isdigit() else name.lower()
+    if name not in SPECIES:
+        raise HTTPException(status_code=404, detail="Not found")
+    return payload(name)
+
+
+def sprite(poke_id: int, size: int) -> bytes:
+    """A solid square PNG, coloured by species id."""
+    colour = ((poke_id * 67) % 256, (poke_id * 131) % 256, (poke_id * 197) % 256, 255)
+    buffer = io.BytesIO()
+    Image.new("RGBA", (size, size), colour).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@app.get("/sprites/pokemon/{poke_id}.png")
+def get_sprite(poke_id: int):
+    if poke_id not in BY_ID:
+        raise HTTPException(status_code=404, detail="Not found")
+    return Response(sprite(poke_id, 96), media_type="image/png")
+
+
+@app.get("/sprites/pokemon/other/official-artwork/{poke_id}.png")
+def get_artwork(poke_id: int):
+    if poke_id not in BY_ID:
+        raise HTTPException(status_code=404, detail="Not found")
+    return Response(sprite(poke_id, 475), media_type="image/png")
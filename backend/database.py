@@ -1,14 +1,82 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./pokemoncrew.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pokemoncrew.db")
+
+# Async drivers for the database URLs we know about
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)).render_as_string(hide_password=False)
+
+# INSERT constructs with ON CONFLICT (upsert) support, per dialect name
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(SQLALCHEMY_DATABASE_URL))
+
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+connect_args = {"check_same_thread": False} if IS_SQLITE else {}
+
+# SQLite storage profiles. "wal" lets readers run alongside the writer and only
+# fsyncs at checkpoints; a crash can lose the last transactions but never corrupts
+# the database. "safe" keeps SQLite's defaults (rollback journal, fsync per commit).
+STORAGE_PROFILES = {
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    },
+    "safe": {
+        "busy_timeout": 5000,
+    },
+}
+DB_PROFILE = os.getenv("DB_PROFILE", "wal")
+
+def sqlite_pragmas() -> dict:
+    """Pragmas of the selected profile, each overridable with DB_<PRAGMA> (e.g. DB_SYNCHRONOUS=FULL)."""
+    pragmas = dict(STORAGE_PROFILES[DB_PROFILE])
+    for name in ("journal_mode", "synchronous", "mmap_size", "busy_timeout", "temp_store", "cache_size"):
+        value = os.getenv(f"DB_{name.upper()}")
+        if value:
+            pragmas[name] = value
+    return pragmas
+
+def pool_options() -> dict:
+    """Connection pool sizing from DB_POOL_SIZE / DB_MAX_OVERFLOW, when set."""
+    options = {}
+    if os.getenv("DB_POOL_SIZE"):
+        options["pool_size"] = int(os.getenv("DB_POOL_SIZE"))
+    if os.getenv("DB_MAX_OVERFLOW"):
+        options["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW"))
+    return options
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in sqlite_pragmas().items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args=connect_args, **pool_options()
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Used by async route handlers, so queries never block the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options())
+
+if IS_SQLITE:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # Dependency to get the DB session
@@ -18,3 +86,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async DB session, for `async def` routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,79 @@
+"""
+Streaming export of a user's battle history as NDJSON or CSV.
+
+Rows are read with a server-side cursor in chunks and written out as they
+arrive, so memory stays flat however many battles a user has.
+"""
+import csv
+import io
+import json
+from typing import Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+
+from backend import models, database
+
+CHUNK_SIZE = 500
+SUMMARY_FIELDS = ["id", "timestamp", "pokemon1_name", "pokemon2_name", "winner_name", "seed"]
+STATS_FIELDS = ["pokemon1_stats", "pokemon2_stats"]
+
+
+def _battle_rows(user_id: int, include_log: bool) -> Iterator[dict]:
+    # The export outlives the request's session, so it opens its own.
+    db = database.SessionLocal()
+    try:
+        columns = [getattr(models.BattleLog, f) for f in SUMMARY_FIELDS + STATS_FIELDS]
+        if include_log:
+            columns += [models.BattleLog.log_json, models.BattleLog.events]
+        query = (
+            select(models.BattleLog)
+            .options(load_only(*columns))
+            .where(models.BattleLog.user_id == user_id)
+            .order_by(models.BattleLog.id)
+            .execution_options(yield_per=CHUNK_SIZE)
+        )
+        for battle in db.execute(query).scalars():
+            row = {f: getattr(battle, f) for f in SUMMARY_FIELDS}
+            row["timestamp"] = battle.timestamp.isoformat() if battle.timestamp else None
+            # Stats are already stored as JSON text
+            row.update({f: getattr(battle, f) for f in STATS_FIELDS})
+            if include_log:
+                row["log"] = battle.log if battle.events is not None else json.loads(battle.log_json or "[]")
+            # Release the row, the session would otherwise keep every battle read so far
+            db.expunge(battle)
+            yield row
+    finally:
+        db.close()
+
+
+def stream_ndjson(user_id: int, include_log: bool = False) -> Iterator[str]:
+    lines = []
+    for row in _battle_rows(user_id, include_log):
+        stats = {f: row.pop(f) for f in STATS_FIELDS}
+        line = json.dumps(row)
+        # Splice the stored stats JSON in without a decode/encode round trip
+        line = line[:-1] + "".join(f', "{f}": {stats[f] or "null"}' for f in STATS_FIELDS) + "}"
+        lines.append(line + "\n")
+        if len(lines) >= CHUNK_SIZE:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+def stream_csv(user_id: int, include_log: bool = False) -> Iterator[str]:
+    fields = SUMMARY_FIELDS + STATS_FIELDS + (["log"] if include_log else [])
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    for count, row in enumerate(_battle_rows(user_id, include_log), start=1):
+        if include_log:
+            row["log"] = json.dumps(row["log"])
+        writer.writerow(row)
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.getvalue():
+        yield buffer.getvalue()
@@ -0,0 +1,82 @@
+"""
+Password hashing off the event loop and off FastAPI's shared threadpool.
+
+bcrypt costs 100-300 ms of CPU per call, so hashes and verifications run in a
+dedicated process pool. At most HASH_QUEUE_DEPTH calls may be queued or running
+at once; beyond that callers get a 503 straight away instead of piling up.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+# Cost parameter for new hashes. Hashes made with a different cost are
+# rehashed the next time their owner logs in.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", os.cpu_count() or 1))
+HASH_QUEUE_DEPTH = int(os.getenv("HASH_QUEUE_DEPTH", HASH_WORKERS * 4))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn rather than fork: the server process has threads and an event loop running
+        _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def _run(fn, *args):
+    global _pending
+    if _pending >= HASH_QUEUE_DEPTH:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The server is busy, please try again shortly.",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    try:
+        return await asyncio.wrap_future(get_executor().submit(fn, *args))
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Returns (valid, new_hash). `new_hash` is set when the stored hash was made
+    with outdated cost parameters and should be replaced.
+    """
+    return await _run(_verify_and_update, password, hashed_password)
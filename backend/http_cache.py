@@ -0,0 +1,83 @@
+"""
+HTTP conditional requests: ETag, Last-Modified, If-None-Match and Cache-Control.
+
+Where the ETag can be known up front (a battle id, the snapshot version), the
+routes check it before doing any work, so a revalidation is answered with a
+304 without touching the database or PokeAPI.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+POKEDEX_MAX_AGE = int(os.getenv("POKEDEX_MAX_AGE", 3600))
+
+# Battles never change once saved. Cached per user, so not in shared caches.
+IMMUTABLE = "private, max-age=31536000, immutable"
+# Sprites are fetched once and never refreshed, so they are immutable too
+PUBLIC_IMMUTABLE = "public, max-age=31536000, immutable"
+POKEDEX = f"public, max-age={POKEDEX_MAX_AGE}, stale-while-revalidate={POKEDEX_MAX_AGE * 24}"
+
+# Bump when the battle response bodies change shape, so clients refetch them
+BATTLE_ETAG_VERSION = 1
+
+
+def battle_etag(kind: str, user_id: int, battle_id: int) -> str:
+    return f'"{kind}-{BATTLE_ETAG_VERSION}-{user_id}-{battle_id}"'
+
+
+def content_etag(content: Any) -> str:
+    return '"' + hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()[:16] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check, with the weak comparison RFC 9110 asks for."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def not_modified_since(request: Request, last_modified: datetime) -> bool:
+    """
+    If-Modified-Since check, ignored when the request has If-None-Match as
+    RFC 9110 asks. Unlike an ETag, a date doesn't identify the resource, so
+    only check it once the resource has been found.
+    """
+    header = request.headers.get("if-modified-since")
+    if not header or "if-none-match" in request.headers:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have a resolution of one second
+    return last_modified.replace(microsecond=0) <= since
+
+
+def http_date(value: datetime) -> str:
+    # SQLite gives back naive timestamps, stored in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def set_headers(response: Response, etag: str, cache_control: str, last_modified: Optional[datetime] = None):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
@@ -0,0 +1,136 @@
+"""
+Leaderboard counters.
+
+Per-species and per-user win/loss/battle counts are kept in their own tables
+and updated in the same transaction as the battle logs they count, so
+rankings read a few indexed rows instead of scanning `battle_logs`.
+
+To recount everything from the existing battle logs:
+
+    python -m backend.leaderboard rebuild
+"""
+import argparse
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend import models, database
+
+
+def tally(battles: Iterable[dict]):
+    """
+    Count wins, losses and battles per species, per (user, species) and per user.
+    Each battle is a dict with pokemon1_name, pokemon2_name, winner_name and user_id.
+    """
+    species = Counter()
+    user_species = Counter()
+    users = Counter()
+    for battle in battles:
+        p1, p2, user_id = battle["pokemon1_name"], battle["pokemon2_name"], battle["user_id"]
+        # A species can fight itself, so the winner is decided by side, not by name
+        winner, loser = (p1, p2) if battle["winner_name"] == p1 else (p2, p1)
+        for name, won in ((winner, True), (loser, False)):
+            key = "wins" if won else "losses"
+            species[(name, key)] += 1
+            species[(name, "battles")] += 1
+            if user_id is not None:
+                user_species[(user_id, name, key)] += 1
+                user_species[(user_id, name, "battles")] += 1
+        if user_id is not None:
+            users[user_id] += 1
+    return species, user_species, users
+
+
+def _species_rows(species: Counter) -> list[dict]:
+    names = {name for name, _ in species}
+    return [
+        {"name": n, "wins": species[(n, "wins")], "losses": species[(n, "losses")], "battles": species[(n, "battles")]}
+        for n in sorted(names)
+    ]
+
+
+def _user_species_rows(user_species: Counter) -> list[dict]:
+    keys = {(user_id, name) for user_id, name, _ in user_species}
+    return [
+        {
+            "user_id": u,
+            "name": n,
+            "wins": user_species[(u, n, "wins")],
+            "losses": user_species[(u, n, "losses")],
+            "battles": user_species[(u, n, "battles")],
+        }
+        for u, n in sorted(keys)
+    ]
+
+
+def _upserts(dialect_name: str, counts):
+    """(statement, parameters) pairs that add the `tally` counts to the counters."""
+    insert = database.UPSERT_INSERTS[dialect_name]
+    species, user_species, users = counts
+    statements = []
+    for model, keys, rows in (
+        (models.SpeciesRecord, ["name"], _species_rows(species)),
+        (models.UserSpeciesRecord, ["user_id", "name"], _user_species_rows(user_species)),
+        (models.UserRecord, ["user_id"], [{"user_id": u, "battles": n} for u, n in sorted(users.items())]),
+    ):
+        if not rows:
+            continue
+        stmt = insert(model)
+        counters = [c for c in rows[0] if c not in keys]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in counters},
+        )
+        statements.append((stmt, rows))
+    return statements
+
+
+async def record_battles(db: AsyncSession, battles: list[dict]):
+    """Add saved battles to the counters, inside the caller's transaction."""
+    for stmt, rows in _upserts(db.get_bind().dialect.name, tally(battles)):
+        await db.execute(stmt, rows)
+
+
+def rebuild(db: Session, batch_size: int = 5000) -> int:
+    """Recount every counter from `battle_logs`. Returns the number of battles counted."""
+    for model in (models.SpeciesRecord, models.UserSpeciesRecord, models.UserRecord):
+        db.query(model).delete()
+    query = select(
+        models.BattleLog.pokemon1_name,
+        models.BattleLog.pokemon2_name,
+        models.BattleLog.winner_name,
+        models.BattleLog.user_id,
+    ).execution_options(yield_per=batch_size)
+    # Stream the battles, only the counts are kept in memory
+    counted = 0
+    def battles():
+        nonlocal counted
+        for row in db.execute(query):
+            counted += 1
+            yield row._asdict()
+    for stmt, rows in _upserts(db.get_bind().dialect.name, tally(battles())):
+        db.execute(stmt, rows)
+    db.commit()
+    return counted
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m backend.leaderboard", description="Manage the leaderboard counters.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild", help="Recount all counters from the saved battle logs.")
+    parser.parse_args(argv)
+
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        count = rebuild(db)
+    finally:
+        db.close()
+    print(f"Rebuilt the leaderboards from {count} battles.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,42 @@
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, HTTPException, Depends
-from backend import models, database, auth
-from backend.routes import team, battle, user
-import httpx
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from backend import models, database, auth, pokeapi, snapshot, migrations, hashing, battle_store, tournament, metrics, http_cache, sprites, search
+from backend.routes import team, battle, user, leaderboard
+from backend.routes import sprites as sprite_routes
 
 models.Base.metadata.create_all(bind=database.engine)
+migrations.upgrade(database.engine)
+metrics.instrument_engine(database.engine)
+metrics.instrument_engine(database.async_engine.sync_engine)
 
-app = FastAPI(title="MyPokemonCrew API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled upstream client for the whole app lifetime
+    await pokeapi.startup()
+    await sprites.startup()
+    # Serve species from the local snapshot when one has been imported
+    db = database.SessionLocal()
+    try:
+        snapshot.load(db)
+    finally:
+        db.close()
+    battle_store.start()
+    yield
+    await battle_store.stop()
+    await pokeapi.shutdown()
+    await sprites.shutdown()
+    hashing.shutdown()
+    tournament.shutdown()
+    await database.async_engine.dispose()
+
+
+app = FastAPI(title="MyPokemonCrew API", lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",
@@ -14,11 +44,11 @@ origins = [
 ]
 
 
-POKEAPI_URL = "https://pokeapi.co/api/v2"
-
 app.include_router(team.router, prefix="/api/team", tags=["Team"], dependencies=[Depends(auth.require_admin)])
 app.include_router(battle.router, prefix="/api/battle", tags=["Battle"])
 app.include_router(user.router, prefix="/api/users", tags=["Users"])
+app.include_router(leaderboard.router, prefix="/api/leaderboard", tags=["Leaderboard"])
+app.include_router(sprite_routes.router, prefix="/api/sprites", tags=["Sprites"])
 
 # Allow frontend to access backend
 app.add_middleware(
@@ -27,43 +57,121 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # GET, POST, etc.
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+# Outermost, so the time spent in the other middleware is measured too
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus metrics of this process."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def snapshot_etag() -> str:
+    # Every Pokédex response is derived from the snapshot, so its version identifies them all
+    return f'"species-{snapshot.version()}"'
 
 @app.get("/api/pokemon/")
-async def list_pokemons(limit: int = 20, offset: int = 0):
+async def list_pokemons(request: Request, response: Response, limit: int = 20, offset: int = 0):
     """List Pokémon with pagination."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{POKEAPI_URL}/pokemon?limit={limit}&offset={offset}")
-        data = response.json()
+    if snapshot.is_loaded():
+        etag = snapshot_etag()
+        if http_cache.etag_matches(request, etag):
+            return http_cache.not_modified(etag, http_cache.POKEDEX)
+        http_cache.set_headers(response, etag, http_cache.POKEDEX)
+        return snapshot.page(limit, offset)
 
-        results = []
-        for p in data["results"]:
-            poke_id = p["url"].split("/")[-2]
-            results.append({
-                "id": poke_id,
-                "name": p["name"].capitalize(),
-                "image": f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{poke_id}.png"
-            })
+    data = await pokeapi.list_pokemon(limit, offset)
 
-        return {"count": data["count"], "results": results}
+    results = []
+    for p in data["results"]:
+        poke_id = p["url"].split("/")[-2]
+        results.append({
+            "id": poke_id,
+            "name": p["name"].capitalize(),
+            "image": sprites.url("default", poke_id)
+        })
+
+    body = {"count": data["count"], "results": results}
+    # Without a snapshot the body has to be built to know its ETag, but a match still saves sending it
+    etag = http_cache.content_etag(body)
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, http_cache.POKEDEX)
+    http_cache.set_headers(response, etag, http_cache.POKEDEX)
+    return body
+
+@app.get("/api/pokemon/search")
+async def search_pokemons(
+    request: Request,
+    response: Response,
+    q: str = "",
+    types: list[str] = Query([], alias="type"),
+    stats: list[str] = Query([], alias="stat", description='Base stat ranges such as "speed>100" or "attack<=80".'),
+    sort: Optional[str] = Query(None, description="A base stat to order by, highest first."),
+    fuzzy: bool = True,
+    limit: int = Query(20, ge=1, le=search.MAX_RESULTS),
+):
+    """
+    Search the Pokédex by name prefix, with fuzzy matches for typos, and filter
+    by types (all must match) and base stat ranges, e.g. ?type=fire&stat=speed>100.
+    Answered from in-memory indexes of the species snapshot.
+    """
+    if not snapshot.is_loaded():
+        raise HTTPException(status_code=503, detail="Search needs the species snapshot: python -m backend.snapshot import")
+    if sort is not None and sort not in search.STATS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort, expected one of {', '.join(search.STATS)}")
+    try:
+        stat_filters = [search.parse_stat_filter(spec) for spec in stats]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    etag = snapshot_etag()
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, http_cache.POKEDEX)
+    http_cache.set_headers(response, etag, http_cache.POKEDEX)
+    return search.search(q, fuzzy, types, stat_filters, sort, limit)
+
+@app.post("/api/pokemon/reload", dependencies=[Depends(auth.require_admin)])
+async def reload_species(db: Session = Depends(database.get_db)):
+    """
+    Reload the species snapshot after an import, without a restart. Only the
+    species that changed are reindexed for search. Applies to this process.
+    """
+    # Read the table off the event loop, but swap the snapshot and update the
+    # search indexes on it, so searches never see them half updated
+    records, index = await run_in_threadpool(snapshot.read, db)
+    count = snapshot.install(records, index)
+    return {"species": count, "version": snapshot.version()}
 
 @app.get("/api/pokemon/{name}")
-async def pokemon_detail(name: str):
+async def pokemon_detail(name: str, request: Request, response: Response):
     """Details of a specific Pokémon by name."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{POKEAPI_URL}/pokemon/{name.lower()}")
-        if response.status_code != 200:
+    if snapshot.is_loaded():
+        # The ETag is shared by every species, so make sure this one exists first (in memory)
+        pokemon = snapshot.get_detail(name)
+        if pokemon is None:
             raise HTTPException(status_code=404, detail="Pokemon not found")
-        data = response.json()
-
-        pokemon = {
-            "id": data["id"],
-            "name": data["name"].capitalize(),
-            "height": data["height"],
-            "weight": data["weight"],
-            "types": [t["type"]["name"] for t in data["types"]],
-            "stats": {s["stat"]["name"]: s["base_stat"] for s in data["stats"]},
-            "image": data["sprites"]["other"]["official-artwork"]["front_default"]
-        }
-
-        return pokemon
\ No newline at end of file
+        etag = snapshot_etag()
+        if http_cache.etag_matches(request, etag):
+            return http_cache.not_modified(etag, http_cache.POKEDEX)
+        http_cache.set_headers(response, etag, http_cache.POKEDEX)
+        return pokemon
+
+    data = await pokeapi.get_pokemon(name)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Pokemon not found")
+
+    pokemon = {
+        "id": data["id"],
+        "name": data["name"].capitalize(),
+        "height": data["height"],
+        "weight": data["weight"],
+        "types": [t["type"]["name"] for t in data["types"]],
+        "stats": {s["stat"]["name"]: s["base_stat"] for s in data["stats"]},
+        "image": sprites.url("artwork", data["id"])
+    }
+
+    etag = http_cache.content_etag(pokemon)
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, http_cache.POKEDEX)
+    http_cache.set_headers(response, etag, http_cache.POKEDEX)
+    return pokemon
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""
+Type effectiveness, matchup matrices and team-vs-team battles.
+
+A hit's damage is max(1, round(attack / defense * 10 * multiplier * uniform(0.9, 1.1))),
+where the multiplier comes from the 18x18 type chart: the attacker uses the
+better of its types, and the multipliers against each of the defender's types
+are multiplied. The chip damage floor of 1 also applies to immunities, so a
+battle always ends.
+
+For two rosters, `matchup` computes every attacker/defender pairing at once:
+the multipliers, the expected damage per hit, the hits needed to knock out,
+and an advantage score. Team battles use those matrices both to choose which
+Pokémon to send out and to resolve each turn.
+"""
+import random
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+TYPES = [
+    "normal", "fire", "water", "electric", "grass", "ice", "fighting", "poison", "ground",
+    "flying", "psychic", "bug", "rock", "ghost", "dragon", "dark", "steel", "fairy",
+]
+TYPE_INDEX = {name: i for i, name in enumerate(TYPES)}
+# Index for a missing or unknown type; neutral both ways
+NEUTRAL = len(TYPES)
+
+# attacking type -> {defending type: multiplier}, for every multiplier that isn't 1
+_CHART = {
+    "normal": {"rock": 0.5, "ghost": 0, "steel": 0.5},
+    "fire": {"fire": 0.5, "water": 0.5, "grass": 2, "ice": 2, "bug": 2, "rock": 0.5, "dragon": 0.5, "steel": 2},
+    "water": {"fire": 2, "water": 0.5, "grass": 0.5, "ground": 2, "rock": 2, "dragon": 0.5},
+    "electric": {"water": 2, "electric": 0.5, "grass": 0.5, "ground": 0, "flying": 2, "dragon": 0.5},
+    "grass": {
+        "fire": 0.5, "water": 2, "grass": 0.5, "poison": 0.5, "ground": 2, "flying": 0.5,
+        "bug": 0.5, "rock": 2, "dragon": 0.5, "steel": 0.5,
+    },
+    "ice": {"fire": 0.5, "water": 0.5, "grass": 2, "ice": 0.5, "ground": 2, "flying": 2, "dragon": 2, "steel": 0.5},
+    "fighting": {
+        "normal": 2, "ice": 2, "poison": 0.5, "flying": 0.5, "psychic": 0.5, "bug": 0.5,
+        "rock": 2, "ghost": 0, "dark": 2, "steel": 2, "fairy": 0.5,
+    },
+    "poison": {"grass": 2, "poison": 0.5, "ground": 0.5, "rock": 0.5, "ghost": 0.5, "steel": 0, "fairy": 2},
+    "ground": {"fire": 2, "electric": 2, "grass": 0.5, "poison": 2, "flying": 0, "bug": 0.5, "rock": 2, "steel": 2},
+    "flying": {"electric": 0.5, "grass": 2, "fighting": 2, "bug": 2, "rock": 0.5, "steel": 0.5},
+    "psychic": {"fighting": 2, "poison": 2, "psychic": 0.5, "dark": 0, "steel": 0.5},
+    "bug": {
+        "fire": 0.5, "grass": 2, "fighting": 0.5, "poison": 0.5, "flying": 0.5, "psychic": 2,
+        "ghost": 0.5, "dark": 2, "steel": 0.5, "fairy": 0.5,
+    },
+    "rock": {"fire": 2, "ice": 2, "fighting": 0.5, "ground": 0.5, "flying": 2, "bug": 2, "steel": 0.5},
+    "ghost": {"normal": 0, "psychic": 2, "ghost": 2, "dark": 0.5},
+    "dragon": {"dragon": 2, "steel": 0.5, "fairy": 0},
+    "dark": {"fighting": 0.5, "psychic": 2, "ghost": 2, "dark": 0.5, "fairy": 0.5},
+    "steel": {"fire": 0.5, "water": 0.5, "electric": 0.5, "ice": 2, "rock": 2, "steel": 0.5, "fairy": 2},
+    "fairy": {"fire": 0.5, "fighting": 2, "poison": 0.5, "dragon": 2, "dark": 2, "steel": 0.5},
+}
+
+
+def _effectiveness_table() -> np.ndarray:
+    """19x19 multipliers, attacking type by defending type; the last row and column are NEUTRAL."""
+    table = np.ones((len(TYPES) + 1, len(TYPES) + 1))
+    for attacking, row in _CHART.items():
+        for defending, multiplier in row.items():
+            table[TYPE_INDEX[attacking], TYPE_INDEX[defending]] = multiplier
+    table.flags.writeable = False
+    return table
+
+
+_TABLE = _effectiveness_table()
+EFFECTIVENESS = _TABLE[:-1, :-1]
+
+MATCHUP_CACHE_SIZE = 256
+
+
+class Fighter(NamedTuple):
+    name: str
+    hp: int
+    attack: int
+    defense: int
+    speed: int
+    types: tuple[str, ...]
+
+    @classmethod
+    def from_stats(cls, stats: dict) -> "Fighter":
+        return cls(stats["name"], stats["hp"], stats["attack"], stats["defense"], stats["speed"], tuple(stats.get("types", ())))
+
+
+class Matchup(NamedTuple):
+    """
+    Matrices between two rosters, indexed [side][attacker, defender]: side 0 is
+    the first roster attacking the second, side 1 the second attacking the first.
+    """
+    multiplier: tuple[np.ndarray, np.ndarray]
+    damage: tuple[np.ndarray, np.ndarray] # Expected damage per hit, before the chip damage floor
+    hits_to_ko: tuple[np.ndarray, np.ndarray]
+    # Turns the opponent needs to knock out minus turns needed to knock it out,
+    # +-0.5 for attacking first. Positive favours the attacker.
+    advantage: tuple[np.ndarray, np.ndarray]
+
+
+def _type_indices(roster: tuple[Fighter, ...]) -> np.ndarray:
+    """(len(roster), 2) type indices; single-type Pokémon get NEUTRAL as their second type."""
+    indices = np.full((len(roster), 2), NEUTRAL)
+    for i, fighter in enumerate(roster):
+        for slot, name in enumerate(fighter.types[:2]):
+            indices[i, slot] = TYPE_INDEX.get(name, NEUTRAL)
+    return indices
+
+
+def _multipliers(attackers: np.ndarray, defenders: np.ndarray) -> np.ndarray:
+    # (19, n): every attacking type against each defender's combined types
+    against = _TABLE[:, defenders[:, 0]] * _TABLE[:, defenders[:, 1]]
+    first = against[attackers[:, 0]]
+    # A missing second type falls back to the first, never to NEUTRAL
+    second_types = np.where(attackers[:, 1] == NEUTRAL, attackers[:, 0], attackers[:, 1])
+    return np.maximum(first, against[second_types])
+
+
+@lru_cache(maxsize=MATCHUP_CACHE_SIZE)
+def matchup(roster1: tuple[Fighter, ...], roster2: tuple[Fighter, ...]) -> Matchup:
+    """Matchup matrices between two rosters. Cached, the returned arrays are read-only."""
+    rosters = (roster1, roster2)
+    types = [_type_indices(roster) for roster in rosters]
+    hp, attack, defense, speed = (
+        [np.array([getattr(f, field) for f in roster], dtype=float) for roster in rosters]
+        for field in ("hp", "attack", "defense", "speed")
+    )
+    multiplier, damage, hits = [], [], []
+    for side in (0, 1):
+        other = 1 - side
+        mult = _multipliers(types[side], types[other])
+        dmg = attack[side][:, None] / defense[other][None, :] * 10 * mult
+        multiplier.append(mult)
+        damage.append(dmg)
+        hits.append(np.ceil(hp[other][None, :] / np.maximum(1, dmg)))
+    # Ties in speed go to the first roster, as in 1v1 battles
+    first = np.where(speed[0][:, None] >= speed[1][None, :], 0.5, -0.5)
+    advantage = hits[1].T - hits[0] + first
+    result = Matchup(tuple(multiplier), tuple(damage), tuple(hits), (advantage, -advantage.T))
+    for matrices in result:
+        for matrix in matrices:
+            matrix.flags.writeable = False
+    return result
+
+
+def _effect_line(multiplier: float) -> str:
+    if multiplier > 1:
+        return "It's super effective!"
+    if multiplier == 0:
+        return "It has no effect..."
+    if multiplier < 1:
+        return "It's not very effective..."
+    return ""
+
+
+def iter_team_battle(team_names: tuple[str, str], rosters: tuple[tuple[Fighter, ...], tuple[Fighter, ...]], seed: int):
+    """
+    Play a team battle step by step. Each side leads with the Pokémon that has
+    the best average advantage over the other roster, and replaces a fainted
+    Pokémon with the one that has the best advantage over the opponent on the field.
+    Yields dicts with the step "type" ("start", "send_out", "turn" and a last
+    "end") and the log "lines" it adds. The end step carries the winning side,
+    the send-out order of each side, the remaining HP and the number of turns.
+    """
+    rng = random.Random(seed)
+    m = matchup(*rosters)
+    hp = [[f.hp for f in roster] for roster in rosters]
+    order = ([], [])
+    yield {"type": "start", "lines": [f"Team battle starts between {team_names[0]} and {team_names[1]}!"]}
+
+    def send_out(side: int, against: int = -1) -> dict:
+        alive = [i for i, h in enumerate(hp[side]) if h > 0]
+        if against < 0:
+            scores = m.advantage[side][alive].mean(axis=1)
+        else:
+            scores = m.advantage[side][alive, against]
+        choice = alive[int(np.argmax(scores))]
+        name = rosters[side][choice].name
+        order[side].append(name)
+        active[side] = choice
+        return {"type": "send_out", "side": side, "name": name, "lines": [f"{team_names[side]} sends out {name}."]}
+
+    active = [0, 0]
+    yield send_out(0)
+    yield send_out(1)
+    attacker = None
+    turns = 0
+    while True:
+        lines = []
+        if attacker is None:
+            # A new pairing: the faster Pokémon attacks first, ties go to the first side
+            attacker = 0 if rosters[0][active[0]].speed >= rosters[1][active[1]].speed else 1
+            lines.append(f"{rosters[attacker][active[attacker]].name} is faster and attacks first.")
+        defender = 1 - attacker
+        i, j = active[attacker], active[defender]
+        attacker_name, defender_name = rosters[attacker][i].name, rosters[defender][j].name
+        damage = max(1, round(m.damage[attacker][i, j] * rng.uniform(0.9, 1.1)))
+        turns += 1
+        hp[defender][j] = max(0, hp[defender][j] - damage)
+        line = f"{attacker_name} attacks {defender_name} for {damage} damage."
+        effect = _effect_line(m.multiplier[attacker][i, j])
+        lines.append(f"{line} {effect}" if effect else line)
+        lines.append(f"{defender_name} has {hp[defender][j]} HP remaining.")
+        if hp[defender][j] == 0:
+            lines.append(f"{defender_name} fainted.")
+        yield {
+            "type": "turn",
+            "attacker": attacker,
+            "damage": damage,
+            "multiplier": float(m.multiplier[attacker][i, j]),
+            "defender_hp": hp[defender][j],
+            "lines": lines,
+        }
+        if hp[defender][j] > 0:
+            attacker = defender
+            continue
+        if not any(hp[defender]):
+            yield {
+                "type": "end",
+                "winner": attacker,
+                "order": order,
+                "remaining_hp": hp,
+                "turns": turns,
+                "lines": [f"{team_names[attacker]} wins!"],
+            }
+            return
+        yield send_out(defender, against=i)
+        attacker = None
+
+
+def play_team_battle(team_names: tuple[str, str], rosters: tuple[tuple[Fighter, ...], tuple[Fighter, ...]], seed: int) -> dict:
+    """
+    Play a whole team battle, see `iter_team_battle`. Returns the winning side,
+    the send-out order of each side, the remaining HP, the number of turns and the log.
+    """
+    log = []
+    for step in iter_team_battle(team_names, rosters, seed):
+        log.extend(step["lines"])
+    return {**{k: step[k] for k in ("winner", "order", "remaining_hp", "turns")}, "log": log}
+
+
+def preview(rosters: tuple[tuple[Fighter, ...], tuple[Fighter, ...]]) -> dict:
+    """The matchup matrices as plain lists, from the first roster's point of view."""
+    m = matchup(*rosters)
+    return {
+        "multiplier": m.multiplier[0].tolist(),
+        "damage": np.maximum(1, np.rint(m.damage[0])).astype(int).tolist(),
+        "damage_taken": np.maximum(1, np.rint(m.damage[1].T)).astype(int).tolist(),
+        "hits_to_ko": m.hits_to_ko[0].astype(int).tolist(),
+        "hits_to_be_ko": m.hits_to_ko[1].T.astype(int).tolist(),
+        "advantage": m.advantage[0].tolist(),
+    }
@@ -0,0 +1,203 @@
+"""
+Process metrics in the Prometheus text format, served on /metrics.
+
+- http_request_duration_seconds: latency per route template, method and status
+- http_request_db_statements: SQL statements per request, per route
+- db_statement_duration_seconds: every SQL statement, from both engines
+- pokeapi_*: upstream calls (latency, status) and cache lookups
+- battle_turns: turns per battle played, per battle mode
+
+With SLOW_REQUEST_MS set, requests slower than that are logged with the SQL
+statements they ran.
+
+The counters are kept in-process, so each worker process reports its own.
+"""
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 0))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (the last one is +Inf), sum]
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(label_values)
+            if counts is None:
+                counts = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts[0][index] += 1
+            counts[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    labels = _format_labels(self.labels + ("le",), label_values + (le,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {total:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+_registry: list = []
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to serve a request.", ("method", "route", "status"))
+REQUEST_STATEMENTS = Histogram(
+    "http_request_db_statements", "SQL statements run while serving a request.", ("method", "route"), COUNT_BUCKETS)
+STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds", "Time to run a SQL statement.", (), QUERY_LATENCY_BUCKETS)
+POKEAPI_DURATION = Histogram(
+    "pokeapi_request_duration_seconds", "Time of upstream PokeAPI calls.", ("endpoint",))
+POKEAPI_REQUESTS = Counter(
+    "pokeapi_requests_total", "Upstream PokeAPI calls by response status.", ("endpoint", "status"))
+POKEAPI_CACHE = Counter(
+    "pokeapi_cache_lookups_total", "PokeAPI cache lookups by the tier that answered.", ("result",))
+BATTLE_TURNS = Histogram(
+    "battle_turns", "Turns (attacks) per battle played.", ("mode",), COUNT_BUCKETS)
+
+
+def render() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+class RequestStats:
+    """SQL activity of the request being served."""
+
+    def __init__(self, record_statements: bool):
+        self.statements = 0
+        self.record_statements = record_statements
+        self.statement_log: list[tuple[float, str]] = []
+
+
+_current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("metrics_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+    STATEMENT_DURATION.observe(elapsed)
+    stats = _current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        if stats.record_statements:
+            stats.statement_log.append((elapsed, statement))
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    started = context.connection.info.get("metrics_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: Engine):
+    """Time every statement run on `engine` (for an AsyncEngine, pass its `sync_engine`)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def pokeapi_endpoint(path: str) -> str:
+    """Low-cardinality label for an upstream path, e.g. "pokemon/{name}"."""
+    resource, _, rest = path.partition("?")[0].partition("/")
+    return f"{resource}/{{name}}" if rest else resource
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request, labelled by route template rather than raw path."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(record_statements=SLOW_REQUEST_MS > 0)
+        token = _current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_request.reset(token)
+            # The router stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_DURATION.observe(elapsed, scope["method"], route, status)
+            REQUEST_STATEMENTS.observe(stats.statements, scope["method"], route)
+            if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+                queries = "".join(f"\n  {ms * 1000:8.1f} ms  {sql}" for ms, sql in stats.statement_log)
+                logger.warning(
+                    "Slow request: %s %s took %.0f ms, status %s, %d SQL statements%s",
+                    scope["method"], scope["path"], elapsed * 1000, status, stats.statements, queries,
+                )
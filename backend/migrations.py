@@ -0,0 +1,120 @@
+"""
+Schema upgrades for databases created by older versions.
+
+`create_all` only creates missing tables, so columns and indexes added to
+existing tables are added here. `upgrade` runs at startup; the data
+migrations are run by hand:
+
+    python -m backend.migrations compact-logs
+"""
+import argparse
+import json
+import re
+from typing import Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from backend import models, database, battle_engine
+
+# table -> [(column, SQL type)]
+ADDED_COLUMNS = {
+    "battle_logs": [("events", "BLOB"), ("seed", "INTEGER"), ("tournament_id", "INTEGER"), ("tournament_round", "INTEGER")],
+}
+
+ATTACK_LINE = re.compile(r"^.+ attacks .+ for (\d+) damage\.$")
+REMAINING_LINE = re.compile(r"^.+ has (\d+) HP remaining\.$")
+
+
+def upgrade(engine: Engine):
+    """Add any columns and indexes missing from existing tables."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            if not inspector.has_table(table):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            for column, sql_type in columns:
+                if column not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}"))
+        for table in models.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def events_from_log(p1_stats: dict, p2_stats: dict, lines: list[str]) -> Optional[list[tuple[int, int, int]]]:
+    """
+    Recover the turn events of a battle saved as English log lines.
+    Returns None if the lines don't render back exactly from the recovered events.
+    """
+    attacker = battle_engine.first_attacker(p1_stats, p2_stats)
+    events = []
+    turn_lines = [line for line in lines[2:] if not line.endswith(" wins!")]
+    for attack_line, remaining_line in zip(turn_lines[::2], turn_lines[1::2]):
+        attack, remaining = ATTACK_LINE.match(attack_line), REMAINING_LINE.match(remaining_line)
+        if not attack or not remaining:
+            return None
+        events.append((attacker, int(attack.group(1)), int(remaining.group(1))))
+        attacker = 1 - attacker
+    if battle_engine.render_log(p1_stats, p2_stats, events) != lines:
+        return None
+    return events
+
+
+def compact_battle_logs(db: Session, batch_size: int = 500) -> tuple[int, int]:
+    """
+    Convert battles stored as JSON log lines to packed events.
+    Returns (converted, skipped); skipped rows keep their JSON log.
+    """
+    converted = skipped = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.query(models.BattleLog)
+            .filter(models.BattleLog.id > last_id, models.BattleLog.events.is_(None), models.BattleLog.log_json.isnot(None))
+            .order_by(models.BattleLog.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        for row in rows:
+            last_id = row.id
+            try:
+                p1_stats, p2_stats = json.loads(row.pokemon1_stats), json.loads(row.pokemon2_stats)
+                events = events_from_log(p1_stats, p2_stats, json.loads(row.log_json))
+            except (ValueError, KeyError, TypeError):
+                events = None
+            if events is None:
+                skipped += 1
+                continue
+            row.events = battle_engine.pack_events(events)
+            row.log_json = None
+            row.pokemon1_stats = json.dumps(p1_stats, separators=(",", ":"))
+            row.pokemon2_stats = json.dumps(p2_stats, separators=(",", ":"))
+            converted += 1
+        db.commit()
+    return converted, skipped
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m backend.migrations", description="Upgrade the database.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("upgrade", help="Add missing columns and indexes to existing tables.")
+    subparsers.add_parser("compact-logs", help="Convert battle logs stored as text to packed events.")
+    args = parser.parse_args(argv)
+
+    models.Base.metadata.create_all(bind=database.engine)
+    upgrade(database.engine)
+    if args.command == "compact-logs":
+        db = database.SessionLocal()
+        try:
+            converted, skipped = compact_battle_logs(db)
+        finally:
+            db.close()
+        print(f"Converted {converted} battle logs, left {skipped} unchanged.")
+
+
+if __name__ == "__main__":
+    main()
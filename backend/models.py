@@ -1,11 +1,16 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, DateTime
+import json
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, DateTime, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from backend.database import Base
+from backend import battle_engine
 
 team_pokemon_association = Table('team_pokemon_association', Base.metadata,
     Column('team_id', Integer, ForeignKey('teams.id')),
-    Column('pokemon_id', Integer, ForeignKey('pokemons.id'))
+    Column('pokemon_id', Integer, ForeignKey('pokemons.id')),
+    # Membership lookups from either side
+    Index('ix_team_pokemon_team_id_pokemon_id', 'team_id', 'pokemon_id'),
+    Index('ix_team_pokemon_pokemon_id_team_id', 'pokemon_id', 'team_id'),
 )
 
 class User(Base):
@@ -22,7 +27,7 @@ class Team(Base):
     __tablename__ = "teams"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     pokemons = relationship("Pokemon", secondary=team_pokemon_association, back_populates="teams")
     user = relationship("User", back_populates="teams")
 
@@ -35,13 +40,82 @@ class Pokemon(Base):
 
 class BattleLog(Base):
     __tablename__ = "battle_logs"
+    __table_args__ = (
+        # Serves the per-user history, newest first
+        Index("ix_battle_logs_user_id_timestamp", "user_id", "timestamp"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     pokemon1_name = Column(String)
     pokemon2_name = Column(String)
     winner_name = Column(String)
-    log = Column(String) # JSON string of battle events
+    log_json = Column("log", String, nullable=True) # JSON list of log lines, only for battles saved before `events`
+    events = Column(LargeBinary, nullable=True) # Packed turn events, see battle_engine
+    seed = Column(Integer, nullable=True) # RNG seed the battle was played with
     pokemon1_stats = Column(String) # JSON string of pokemon 1 stats
     pokemon2_stats = Column(String) # JSON string of pokemon 2 stats
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    tournament_id = Column(Integer, ForeignKey("tournaments.id"), nullable=True, index=True)
+    tournament_round = Column(Integer, nullable=True)
     user = relationship("User", back_populates="battle_logs")
+
+    @property
+    def log(self):
+        """The battle log lines, rendered from the packed events when the row has them."""
+        if self.events is not None:
+            return battle_engine.render_log(
+                json.loads(self.pokemon1_stats),
+                json.loads(self.pokemon2_stats),
+                battle_engine.unpack_events(self.events),
+            )
+        return self.log_json
+
+class Tournament(Base):
+    __tablename__ = "tournaments"
+    id = Column(Integer, primary_key=True, index=True)
+    format = Column(String, nullable=False) # 'round_robin' or 'bracket'
+    entrants = Column(String, nullable=False) # JSON list of {team_id, team_name, name}
+    standings = Column(String, nullable=False) # JSON list, best first
+    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+
+class Species(Base):
+    """Local snapshot of PokeAPI species data, filled by `python -m backend.snapshot import`."""
+    __tablename__ = "species"
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, index=True, nullable=False)
+    types = Column(String, nullable=False) # Comma separated, in slot order
+    hp = Column(Integer, nullable=False)
+    attack = Column(Integer, nullable=False)
+    defense = Column(Integer, nullable=False)
+    special_attack = Column(Integer, nullable=False)
+    special_defense = Column(Integer, nullable=False)
+    speed = Column(Integer, nullable=False)
+    height = Column(Integer)
+    weight = Column(Integer)
+    image = Column(String) # Official artwork URL
+
+# Leaderboard counters, kept up to date with every saved battle (see leaderboard.py)
+class SpeciesRecord(Base):
+    __tablename__ = "species_records"
+    __table_args__ = (
+        Index("ix_species_records_wins", "wins"),
+        Index("ix_species_records_battles", "battles"),
+    )
+    name = Column(String, primary_key=True)
+    wins = Column(Integer, nullable=False, default=0)
+    losses = Column(Integer, nullable=False, default=0)
+    battles = Column(Integer, nullable=False, default=0)
+
+class UserSpeciesRecord(Base):
+    __tablename__ = "user_species_records"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    name = Column(String, primary_key=True)
+    wins = Column(Integer, nullable=False, default=0)
+    losses = Column(Integer, nullable=False, default=0)
+    battles = Column(Integer, nullable=False, default=0)
+
+class UserRecord(Base):
+    __tablename__ = "user_records"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    battles = Column(Integer, nullable=False, default=0, index=True)
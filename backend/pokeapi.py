@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+POKEAPI_URL = os.getenv("POKEAPI_URL", "https://pokeapi.co/api/v2")
+
+# Cache settings. Species data almost never changes, so entries stay fresh for a
+# day and may be served stale (while being refreshed in the background) for a week.
+CACHE_DIR = os.getenv("POKEAPI_CACHE_DIR", "./.pokeapi_cache")
+CACHE_TTL = float(os.getenv("POKEAPI_CACHE_TTL", 24 * 60 * 60))
+CACHE_STALE_TTL = float(os.getenv("POKEAPI_CACHE_STALE_TTL", 7 * 24 * 60 * 60))
+MEMORY_CACHE_SIZE = int(os.getenv("POKEAPI_MEMORY_CACHE_SIZE", 2048))
+
+# Connection pool settings for the shared upstream client
+MAX_CONNECTIONS = int(os.getenv("POKEAPI_MAX_CONNECTIONS", 50))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("POKEAPI_MAX_KEEPALIVE_CONNECTIONS", 20))
+REQUEST_TIMEOUT = float(os.getenv("POKEAPI_TIMEOUT", 10))
+
+
+class MemoryCache:
+    """A small LRU cache of (fetched_at, data) entries keyed by upstream path."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[tuple[float, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: tuple[float, Any]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class DiskCache:
+    """One JSON file per upstream path, named by the hash of the path."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _file_for(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def get(self, key: str) -> Optional[tuple[float, Any]]:
+        try:
+            with open(self._file_for(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            return entry["fetched_at"], entry["data"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key: str, entry: tuple[float, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._file_for(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": entry[0], "data": entry[1]}, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+
+_client: Optional[httpx.AsyncClient] = None
+_memory_cache = MemoryCache(MEMORY_CACHE_SIZE)
+_disk_cache = DiskCache(CACHE_DIR)
+# Upstream fetches currently in flight, so concurrent misses share one request
+_inflight: dict[str, asyncio.Task] = {}
+
+
+async def startup(transport: Optional[httpx.AsyncBaseTransport] = None):
+    """Create the app-lifetime upstream client. Call once from the app lifespan."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = httpx.AsyncClient(
+        base_url=POKEAPI_URL,
+        transport=transport,
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        ),
+    )
+
+
+async def shutdown():
+    global _client
+    for task in list(_inflight.values()):
+        task.cancel()
+    _inflight.clear()
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    if _client is None:
+        raise RuntimeError("PokeAPI client is not started. Call pokeapi.startup() first.")
+    return _client
+
+
+async def _fetch_and_store(path: str) -> Optional[Any]:
+    endpoint = metrics.pokeapi_endpoint(path)
+    start = time.perf_counter()
+    try:
+        response = await get_client().get(f"/{path}")
+    except httpx.HTTPError:
+        metrics.POKEAPI_REQUESTS.inc(endpoint, "error")
+        raise
+    finally:
+        metrics.POKEAPI_DURATION.observe(time.perf_counter() - start, endpoint)
+    metrics.POKEAPI_REQUESTS.inc(endpoint, response.status_code)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    data = response.json()
+    entry = (time.time(), data)
+    _memory_cache.set(path, entry)
+    await asyncio.to_thread(_disk_cache.set, path, entry)
+    return data
+
+
+def _start_fetch(path: str) -> asyncio.Task:
+    task = _inflight.get(path)
+    if task is None:
+        task = asyncio.create_task(_fetch_and_store(path))
+        _inflight[path] = task
+        task.add_done_callback(lambda _: _inflight.pop(path, None))
+    return task
+
+
+def _refresh_in_background(path: str):
+    task = _start_fetch(path)
+
+    def _log_failure(t: asyncio.Task):
+        if not t.cancelled() and t.exception() is not None:
+            logger.warning("Background refresh of %s failed: %s", path, t.exception())
+
+    task.add_done_callback(_log_failure)
+
+
+async def get_json(path: str) -> Optional[Any]:
+    """
+    Fetch a PokeAPI resource (e.g. "pokemon/pikachu") through the tiered cache.
+    Returns None when the upstream answers 404. When PokeAPI fails, serves an
+    expired copy if there is one, and raises a 503 HTTPException otherwise.
+    """
+    tier = "memory"
+    entry = _memory_cache.get(path)
+    if entry is None:
+        tier = "disk"
+        entry = await asyncio.to_thread(_disk_cache.get, path)
+        if entry is not None:
+            _memory_cache.set(path, entry)
+
+    if entry is not None:
+        fetched_at, data = entry
+        age = time.time() - fetched_at
+        if age < CACHE_TTL:
+            metrics.POKEAPI_CACHE.inc(tier)
+            return data
+        if age < CACHE_TTL + CACHE_STALE_TTL:
+            # Stale-while-revalidate: answer now, refresh for the next caller.
+            metrics.POKEAPI_CACHE.inc("stale")
+            _refresh_in_background(path)
+            return data
+
+    metrics.POKEAPI_CACHE.inc("miss")
+    try:
+        # Shield the shared task so one cancelled caller doesn't cancel it for the others.
+        return await asyncio.shield(_start_fetch(path))
+    except httpx.HTTPError as e:
+        if entry is not None:
+            # An expired copy beats no answer while PokeAPI is down
+            logger.warning("Refreshing %s failed, serving the expired copy: %s", path, e)
+            return entry[1]
+        logger.warning("Fetching %s failed: %s", path, e)
+        raise HTTPException(status_code=503, detail="PokeAPI unavailable") from e
+
+
+async def get_pokemon(name: str) -> Optional[dict]:
+    return await get_json(f"pokemon/{name.lower()}")
+
+
+async def list_pokemon(limit: int, offset: int) -> dict:
+    return await get_json(f"pokemon?limit={limit}&offset={offset}")
@@ -0,0 +1,52 @@
+"""
+Shared query builders.
+
+Team reads load their Pokémon with a selectin load (one extra query for any
+number of teams) instead of lazily per team while the response is serialized.
+The builders return `select()` statements so both the sync and the async
+sessions can run them.
+"""
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import selectinload
+
+from backend import models
+
+association = models.team_pokemon_association
+
+
+def user_teams(user_id: int) -> Select:
+    """A user's teams with their Pokémon."""
+    return (
+        select(models.Team)
+        .options(selectinload(models.Team.pokemons))
+        .where(models.Team.user_id == user_id)
+        .order_by(models.Team.id)
+    )
+
+
+def team_by_id(team_id: int) -> Select:
+    """A team with its Pokémon."""
+    return select(models.Team).options(selectinload(models.Team.pokemons)).where(models.Team.id == team_id)
+
+
+def owned_pokemon_names(user_id: int, names: set[str]) -> Select:
+    """
+    Lowercase names, out of `names`, of the Pokémon that are in at least one of
+    the user's teams. One query however many teams the user has. It starts from
+    the user's teams (teams.user_id index), then follows their memberships
+    (team_id, pokemon_id index) to each Pokémon by primary key, so only the
+    user's own Pokémon are read, never the whole pokemons table.
+    """
+    return (
+        select(func.lower(models.Pokemon.name))
+        .select_from(models.Team)
+        .join(association, association.c.team_id == models.Team.id)
+        .join(models.Pokemon, models.Pokemon.id == association.c.pokemon_id)
+        .where(models.Team.user_id == user_id, func.lower(models.Pokemon.name).in_({name.lower() for name in names}))
+        .distinct()
+    )
+
+
+def teams_by_ids(team_ids: list[int]) -> Select:
+    """Teams with their Pokémon, in any order."""
+    return select(models.Team).options(selectinload(models.Team.pokemons)).where(models.Team.id.in_(team_ids))
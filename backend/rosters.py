@@ -0,0 +1,58 @@
+"""
+Bulk roster edits.
+
+A roster change is validated in memory, then written with one upsert for the
+Pokémon rows and one statement each to remove and to add team memberships,
+all in a single transaction.
+"""
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from backend import models, database
+
+MAX_TEAM_SIZE = 6
+
+association = models.team_pokemon_association
+
+
+def validate(names: list[str], team_name: Optional[str] = None):
+    """Reject rosters over the slot limit or with the same Pokémon twice."""
+    where = f" in team '{team_name}'" if team_name else ""
+    if len(names) > MAX_TEAM_SIZE:
+        raise HTTPException(status_code=400, detail=f"A team can have at most {MAX_TEAM_SIZE} Pokemons{where}.")
+    if len(set(names)) != len(names):
+        raise HTTPException(status_code=400, detail=f"The same Pokemon is in the roster more than once{where}.")
+
+
+def upsert_pokemons(db: Session, pokemons: list[dict]) -> dict[str, int]:
+    """
+    Create the missing Pokémon rows and return {name: id} for every given
+    Pokémon, in one statement. Existing rows are left as they are.
+    """
+    unique = list({p["name"]: p for p in pokemons}.values())
+    if not unique:
+        return {}
+    stmt = database.UPSERT_INSERTS[db.get_bind().dialect.name](models.Pokemon).values(unique)
+    # A no-op update rather than DO NOTHING, so existing rows are returned too
+    stmt = stmt.on_conflict_do_update(index_elements=["name"], set_={"name": stmt.excluded.name})
+    return {row.name: row.id for row in db.execute(stmt.returning(models.Pokemon.id, models.Pokemon.name))}
+
+
+def set_memberships(db: Session, team_ids: list[int], pokemon_ids: dict[int, list[int]], remove: Optional[dict[int, list[int]]] = None):
+    """
+    Remove and add team memberships. `remove` maps team id -> Pokémon ids to
+    take out; without it every membership of `team_ids` is removed first.
+    """
+    if remove is None:
+        if team_ids:
+            db.execute(delete(association).where(association.c.team_id.in_(team_ids)))
+    else:
+        for team_id, ids in remove.items():
+            if ids:
+                db.execute(delete(association).where(association.c.team_id == team_id, association.c.pokemon_id.in_(ids)))
+    rows = [{"team_id": team_id, "pokemon_id": pokemon_id} for team_id, ids in pokemon_ids.items() for pokemon_id in ids]
+    if rows:
+        db.execute(insert(association), rows)
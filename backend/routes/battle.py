@@ -1,106 +1,515 @@
-import random
-import httpx
+import asyncio
+import base64
 import json
-from sqlalchemy import desc
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .. import models, database, auth, schemas
+from typing import Literal, Optional
+from sqlalchemy import desc, select, or_, and_, type_coerce, String
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from .. import models, database, auth, schemas, pokeapi, snapshot, simulator, battle_engine, export, battle_store, queries, tournament, matchups, metrics, http_cache, battle_json
 
 router = APIRouter()
 
-POKEAPI_URL = "https://pokeapi.co/api/v2/pokemon/"
+MAX_SIMULATIONS = 200_000
+MAX_HISTORY_PAGE = 200
+MAX_STREAM_INTERVAL_MS = 5000
+# Keep proxies from buffering the event stream
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
 async def get_pokemon_stats(name: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{POKEAPI_URL}{name.lower()}")
-        if response.status_code != 200:
+    if snapshot.is_loaded():
+        record = snapshot.get(name)
+        if record is None:
             raise HTTPException(status_code=404, detail=f"Pokemon '{name}' not found")
-        data = response.json()
-        # Add Pokémon ID to be used in the frontend
-        stats = {s["stat"]["name"]: s["base_stat"] for s in data["stats"]}
-        return {
-            "name": name.capitalize(),
-            "hp": stats.get("hp", 1),
-            "attack": stats.get("attack", 1),
-            "defense": stats.get("defense", 1),
-            "speed": stats.get("speed", 1),
-            "id": data["id"],
-        }
-
-@router.get("/", response_model=list[schemas.BattleLog])
+        poke_id, stats, types = record["id"], record["stats"], record["types"]
+    else:
+        data = await pokeapi.get_pokemon(name)
+        if data is None:
+            raise HTTPException(status_code=404, detail=f"Pokemon '{name}' not found")
+        poke_id, stats = data["id"], {s["stat"]["name"]: s["base_stat"] for s in data["stats"]}
+        types = [t["type"]["name"] for t in sorted(data["types"], key=lambda t: t["slot"])]
+    # Add Pokémon ID to be used in the frontend
+    return {
+        "name": name.capitalize(),
+        "hp": stats.get("hp", 1),
+        "attack": stats.get("attack", 1),
+        "defense": stats.get("defense", 1),
+        "speed": stats.get("speed", 1),
+        "types": types,
+        "id": poke_id,
+    }
+
+def encode_cursor(timestamp: str, battle_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp}|{battle_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        timestamp, battle_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return timestamp, int(battle_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/", response_model=list[schemas.BattleLogSummary], response_class=battle_json.RawJSONResponse)
 async def get_battle_history(
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    limit: int = Query(50, ge=1, le=MAX_HISTORY_PAGE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """
+    Get the battle history for the current user, newest first.
+    When more battles exist, the `X-Next-Cursor` header holds the cursor for the next page.
+    """
+    # Compare timestamps as stored, SQLite keeps them as text
+    raw_timestamp = type_coerce(models.BattleLog.timestamp, String)
+    query = (
+        select(models.BattleLog, raw_timestamp.label("raw_timestamp"))
+        .options(load_only(
+            models.BattleLog.id,
+            models.BattleLog.pokemon1_name,
+            models.BattleLog.pokemon2_name,
+            models.BattleLog.winner_name,
+            models.BattleLog.timestamp,
+        ))
+        .where(models.BattleLog.user_id == current_user.id)
+    )
+    if cursor:
+        timestamp, battle_id = decode_cursor(cursor)
+        query = query.where(or_(
+            raw_timestamp < timestamp,
+            and_(raw_timestamp == timestamp, models.BattleLog.id < battle_id),
+        ))
+    query = query.order_by(desc(models.BattleLog.timestamp), desc(models.BattleLog.id)).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    response = battle_json.RawJSONResponse(battle_json.battle_summaries(battle for battle, _ in rows))
+    if has_more:
+        last_battle, last_timestamp = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last_timestamp, last_battle.id)
+    return response
+
+@router.get("/export")
+def export_battle_history(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    include_log: bool = False,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """Stream the current user's whole battle history as NDJSON or CSV."""
+    if format == "csv":
+        return StreamingResponse(
+            export.stream_csv(current_user.id, include_log),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="battles.csv"'},
+        )
+    return StreamingResponse(export.stream_ndjson(current_user.id, include_log), media_type="application/x-ndjson")
+
+@router.get("/simulate", response_model=schemas.SimulationResult)
+async def simulate_battle(
+    pokemon1: str,
+    pokemon2: str,
+    n: int = Query(10_000, ge=1, le=MAX_SIMULATIONS),
+    seed: Optional[int] = None,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """Estimate the odds of a matchup by simulating `n` battles. Nothing is saved."""
+    p1_stats = await get_pokemon_stats(pokemon1)
+    p2_stats = await get_pokemon_stats(pokemon2)
+    # The simulation is CPU-bound, keep it off the event loop
+    return await run_in_threadpool(simulator.simulate, p1_stats, p2_stats, n, seed)
+
+async def get_user_battle(db: AsyncSession, battle_id: int, user_id: int):
+    query = select(models.BattleLog).where(models.BattleLog.id == battle_id, models.BattleLog.user_id == user_id)
+    return (await db.execute(query)).scalar_one_or_none()
+
+@router.get("/matchup", response_model=schemas.MatchupPreview)
+async def preview_matchup(
+    team1_id: int,
+    team2_id: int,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """
+    Type multipliers, expected damage and advantage for every pairing across two
+    teams, from the first team's point of view. No battle is run.
+    """
+    teams, rosters = await get_rosters(db, current_user, team1_id, team2_id)
+    return {
+        "team1": [{"name": f.name, "types": list(f.types)} for f in rosters[0]],
+        "team2": [{"name": f.name, "types": list(f.types)} for f in rosters[1]],
+        **matchups.preview(rosters),
+    }
+
+@router.get("/tournament/{tournament_id}", response_model=schemas.TournamentResult)
+async def get_tournament(
+    tournament_id: int,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
 ):
-    """Get the battle history for the current user."""
-    return db.query(models.BattleLog).filter(models.BattleLog.user_id == current_user.id).order_by(desc(models.BattleLog.timestamp)).all()
+    saved = await db.get(models.Tournament, tournament_id)
+    if saved is None or saved.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    query = (
+        select(
+            models.BattleLog.tournament_round.label("round"),
+            models.BattleLog.id.label("battle_id"),
+            models.BattleLog.pokemon1_name,
+            models.BattleLog.pokemon2_name,
+            models.BattleLog.winner_name,
+        )
+        .where(models.BattleLog.tournament_id == tournament_id)
+        .order_by(models.BattleLog.id)
+    )
+    return {
+        "id": saved.id,
+        "format": saved.format,
+        "timestamp": saved.timestamp,
+        "entrants": json.loads(saved.entrants),
+        "standings": json.loads(saved.standings),
+        "matches": [row._asdict() for row in await db.execute(query)],
+    }
+
+def sse_event(event: str, data: dict) -> str:
+    """One server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+@router.get("/stream")
+async def stream_battle(
+    pokemon1: str,
+    pokemon2: str,
+    interval_ms: int = Query(0, ge=0, le=MAX_STREAM_INTERVAL_MS),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """
+    Run a battle and stream it as server-sent events: "start" with the initial
+    stats, one "turn" per attack as it is played, `interval_ms` apart, and "end"
+    with the winner and the id of the saved log. The log is saved once the last
+    turn is played; a battle the client disconnects from is not saved.
+    """
+    await ensure_owned(db, current_user, {pokemon1, pokemon2})
+    stats_by_name = await get_stats_for({pokemon1, pokemon2})
+    # The stream saves with its own session, don't hold a connection while it runs
+    await db.close()
+
+    async def events():
+        p1_stats = stats_by_name[pokemon1.lower()].copy()
+        p2_stats = stats_by_name[pokemon2.lower()].copy()
+        initial = (p1_stats.copy(), p2_stats.copy())
+        names = (p1_stats["name"], p2_stats["name"])
+        seed = battle_engine.new_seed()
+        yield sse_event("start", {
+            "p1_stats": initial[0],
+            "p2_stats": initial[1],
+            "log": battle_engine.render_intro(*initial),
+        })
+
+        played = []
+        # The response awaits each send, so a slow client pauses the battle
+        # instead of letting events pile up in memory
+        for attacker, damage, defender_hp in battle_engine.iter_battle(p1_stats, p2_stats, seed):
+            played.append((attacker, damage, defender_hp))
+            yield sse_event("turn", {
+                "attacker": attacker,
+                "damage": damage,
+                "defender_hp": defender_hp,
+                "log": battle_engine.render_turn(names, played[-1]),
+            })
+            if interval_ms:
+                await asyncio.sleep(interval_ms / 1000)
+
+        winner_name = names[played[-1][0] if played else battle_engine.first_attacker(*initial)]
+        metrics.BATTLE_TURNS.observe(len(played), "single")
+        row = battle_row(*initial, winner_name, battle_engine.pack_events(played), seed, current_user.id)
+        async with database.AsyncSessionLocal() as stream_db:
+            [(battle_id, timestamp)] = await battle_store.save_battle_logs(stream_db, [row])
+        yield sse_event("end", {
+            "id": battle_id,
+            "winner": winner_name,
+            "timestamp": timestamp.isoformat(),
+            "p1_stats": p1_stats,
+            "p2_stats": p2_stats,
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=STREAM_HEADERS)
 
-@router.get("/{battle_id}", response_model=schemas.BattleLogDetails)
+@router.get("/team/stream")
+async def stream_team_battle(
+    team1_id: int,
+    team2_id: int,
+    interval_ms: int = Query(0, ge=0, le=MAX_STREAM_INTERVAL_MS),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """
+    Stream a team battle as server-sent events, one per step ("start",
+    "send_out", "turn"), ending with "end" and the same fields as POST /team
+    without the log. Nothing is saved.
+    """
+    teams, rosters = await get_rosters(db, current_user, team1_id, team2_id)
+    await db.close()
+
+    async def events():
+        seed = battle_engine.new_seed()
+        for step in matchups.iter_team_battle((teams[0].name, teams[1].name), rosters, seed):
+            kind, lines = step.pop("type"), step.pop("lines")
+            if kind != "end":
+                yield sse_event(kind, {**step, "log": lines})
+                if kind == "turn" and interval_ms:
+                    await asyncio.sleep(interval_ms / 1000)
+                continue
+            metrics.BATTLE_TURNS.observe(step["turns"], "team")
+            winner = teams[step["winner"]]
+            yield sse_event("end", {
+                "winner": winner.name,
+                "winner_team_id": winner.id,
+                "seed": seed,
+                "team1_order": step["order"][0],
+                "team2_order": step["order"][1],
+                "team1_remaining_hp": step["remaining_hp"][0],
+                "team2_remaining_hp": step["remaining_hp"][1],
+                "log": lines,
+            })
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=STREAM_HEADERS)
+
+@router.get("/{battle_id}", response_model=schemas.BattleLogDetails, response_class=battle_json.RawJSONResponse)
 async def get_battle_details(
     battle_id: int,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    request: Request,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
 ):
-    battle = db.query(models.BattleLog).filter(models.BattleLog.id == battle_id, models.BattleLog.user_id == current_user.id).first()
+    """A saved battle. Battles never change, so an ETag revalidation gets a 304 without a database read."""
+    etag = http_cache.battle_etag("battle", current_user.id, battle_id)
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, http_cache.IMMUTABLE)
+    battle = await get_user_battle(db, battle_id, current_user.id)
     if not battle:
         raise HTTPException(status_code=404, detail="Battle not found")
-    return battle
+    if http_cache.not_modified_since(request, battle.timestamp):
+        return http_cache.not_modified(etag, http_cache.IMMUTABLE)
+    response = battle_json.RawJSONResponse(battle_json.battle_details(battle))
+    http_cache.set_headers(response, etag, http_cache.IMMUTABLE, battle.timestamp)
+    return response
+
+@router.get("/{battle_id}/events", response_model=schemas.BattleEvents, response_class=battle_json.RawJSONResponse)
+async def get_battle_events(
+    battle_id: int,
+    request: Request,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """The compact form of a battle, for clients that render the replay themselves."""
+    etag = http_cache.battle_etag("events", current_user.id, battle_id)
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, http_cache.IMMUTABLE)
+    battle = await get_user_battle(db, battle_id, current_user.id)
+    if not battle:
+        raise HTTPException(status_code=404, detail="Battle not found")
+    if battle.events is None:
+        raise HTTPException(status_code=404, detail="This battle was saved before turn events were recorded.")
+    if http_cache.not_modified_since(request, battle.timestamp):
+        return http_cache.not_modified(etag, http_cache.IMMUTABLE)
+    response = battle_json.RawJSONResponse(battle_json.battle_events(battle))
+    http_cache.set_headers(response, etag, http_cache.IMMUTABLE, battle.timestamp)
+    return response
+
+async def ensure_owned(db: AsyncSession, current_user: auth.CurrentUser, names: set[str]):
+    """Validate whether Pokémon belong to the user's teams."""
+    owned = set((await db.execute(queries.owned_pokemon_names(current_user.id, names))).scalars())
+    if not {name.lower() for name in names} <= owned:
+        raise HTTPException(status_code=403, detail="One or more selected Pokémon are not in your teams.")
+
+async def get_stats_for(names: set[str]) -> dict[str, dict]:
+    """Fetch the stats of every distinct species concurrently, keyed by lowercase name."""
+    distinct = sorted({name.lower() for name in names})
+    results = await asyncio.gather(*[get_pokemon_stats(name) for name in distinct])
+    return dict(zip(distinct, results))
+
+async def get_owned_teams(db: AsyncSession, current_user: auth.CurrentUser, team_ids: list[int]) -> list[models.Team]:
+    """The given teams with their Pokémon, in request order without repeats. All must belong to the user."""
+    team_ids = list(dict.fromkeys(team_ids))
+    teams = {team.id: team for team in (await db.execute(queries.teams_by_ids(team_ids))).scalars()}
+    if len(teams) != len(team_ids):
+        raise HTTPException(status_code=404, detail="Team not found.")
+    if any(team.user_id != current_user.id for team in teams.values()):
+        raise HTTPException(status_code=403, detail="Not authorized to use this team")
+    return [teams[team_id] for team_id in team_ids]
+
+async def get_rosters(db: AsyncSession, current_user: auth.CurrentUser, team1_id: int, team2_id: int):
+    """(team1, team2), (roster1, roster2) of `matchups.Fighter` for a team-vs-team matchup."""
+    teams = await get_owned_teams(db, current_user, [team1_id, team2_id])
+    if len(teams) != 2:
+        raise HTTPException(status_code=400, detail="Two different teams are required.")
+    if not all(team.pokemons for team in teams):
+        raise HTTPException(status_code=400, detail="Both teams need at least one Pokémon.")
+    stats_by_name = await get_stats_for({pokemon.name for team in teams for pokemon in team.pokemons})
+    rosters = tuple(
+        tuple(matchups.Fighter.from_stats(stats_by_name[pokemon.name.lower()]) for pokemon in team.pokemons)
+        for team in teams
+    )
+    return tuple(teams), rosters
+
+def battle_row(p1_stats: dict, p2_stats: dict, winner_name: str, events: bytes, seed: int, user_id: int) -> dict:
+    """Battle log row values, from the initial stats of both Pokémon."""
+    return {
+        "pokemon1_name": p1_stats["name"],
+        "pokemon2_name": p2_stats["name"],
+        "winner_name": winner_name,
+        "events": events,
+        "seed": seed,
+        "pokemon1_stats": json.dumps(p1_stats, separators=(",", ":")),
+        "pokemon2_stats": json.dumps(p2_stats, separators=(",", ":")),
+        "user_id": user_id,
+    }
+
+def fight(pokemon1: str, pokemon2: str, stats_by_name: dict[str, dict], user_id: int):
+    """Run one battle and build (log row values, response payload without id/timestamp)."""
+    p1_stats = stats_by_name[pokemon1.lower()].copy()
+    p2_stats = stats_by_name[pokemon2.lower()].copy()
+    initial_p1_stats = p1_stats.copy()
+    initial_p2_stats = p2_stats.copy()
+
+    seed = battle_engine.new_seed()
+    winner, events = battle_engine.play_battle(p1_stats, p2_stats, seed)
+    winner_name = (p1_stats, p2_stats)[winner]["name"]
+    metrics.BATTLE_TURNS.observe(len(events), "single")
+
+    row = battle_row(initial_p1_stats, initial_p2_stats, winner_name, battle_engine.pack_events(events), seed, user_id)
+    battle_log = battle_engine.render_log(initial_p1_stats, initial_p2_stats, events)
+    return row, {"winner": winner_name, "log": battle_log, "p1_stats": p1_stats, "p2_stats": p2_stats}
 
 @router.post("/", response_model=schemas.BattleResponse)
 async def run_battle(
     pokemon_names: list[str],
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
 ):
     if len(pokemon_names) != 2:
         raise HTTPException(status_code=400, detail="Exactly two pokemon names are required for a battle.")
 
-    # Validate whether Pokémon belong to the user's teams
-    user_pokemons = {p.name.lower() for team in current_user.teams for p in team.pokemons}
-    pokemon1_name_lower = pokemon_names[0].lower()
-    pokemon2_name_lower = pokemon_names[1].lower()
+    await ensure_owned(db, current_user, set(pokemon_names))
+    stats_by_name = await get_stats_for(set(pokemon_names))
 
-    if pokemon1_name_lower not in user_pokemons or pokemon2_name_lower not in user_pokemons:
-        raise HTTPException(status_code=403, detail="One or more selected Pokémon are not in your teams.")
+    row, result = fight(pokemon_names[0], pokemon_names[1], stats_by_name, current_user.id)
+    [(battle_id, timestamp)] = await battle_store.save_battle_logs(db, [row])
 
+    return {**result, "id": battle_id, "timestamp": timestamp}
 
-    p1_stats = await get_pokemon_stats(pokemon_names[0])
-    p2_stats = await get_pokemon_stats(pokemon_names[1])
-    initial_p1_stats = p1_stats.copy()
-    initial_p2_stats = p2_stats.copy()
+@router.post("/batch", response_model=list[schemas.BattleResponse])
+async def run_battles(
+    request: schemas.BatchBattleRequest,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """Run several battles in one request. All logs are saved in a single transaction."""
+    names = {name for m in request.matchups for name in (m.pokemon1, m.pokemon2)}
+    await ensure_owned(db, current_user, names)
+    stats_by_name = await get_stats_for(names)
 
-    # Determine turn order
-    attacker, defender = (p1_stats, p2_stats) if p1_stats["speed"] >= p2_stats["speed"] else (p2_stats, p1_stats)
-
-    battle_log = []
-    battle_log.append(f"Battle starts between {p1_stats['name']} and {p2_stats['name']}!")
-    battle_log.append(f"{attacker['name']} is faster and attacks first.")
-
-    while p1_stats["hp"] > 0 and p2_stats["hp"] > 0:
-        damage = max(1, round((attacker["attack"] / defender["defense"]) * 10 * (random.uniform(0.9, 1.1))))
-        defender["hp"] -= damage
-        battle_log.append(f"{attacker['name']} attacks {defender['name']} for {damage} damage.")
-        battle_log.append(f"{defender['name']} has {max(0, defender['hp'])} HP remaining.")
-
-        if defender["hp"] <= 0:
-            winner_name = attacker["name"]
-            battle_log.append(f"{defender['name']} fainted. {winner_name} wins!")
-            break
-
-        # Swap roles
-        attacker, defender = defender, attacker
-
-    db_log = models.BattleLog(
-        pokemon1_name=pokemon_names[0].capitalize(),
-        pokemon2_name=pokemon_names[1].capitalize(),
-        winner_name=winner_name,
-        log=json.dumps(battle_log),
-        pokemon1_stats=json.dumps(initial_p1_stats),
-        pokemon2_stats=json.dumps(initial_p2_stats),
-        user_id=current_user.id
-    )
-    db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
+    fought = [fight(m.pokemon1, m.pokemon2, stats_by_name, current_user.id) for m in request.matchups]
+    saved = await battle_store.save_battle_logs(db, [row for row, _ in fought])
+
+    return [{**result, "id": battle_id, "timestamp": timestamp} for (_, result), (battle_id, timestamp) in zip(fought, saved)]
+
+@router.post("/tournament", response_model=schemas.TournamentResult)
+async def run_tournament(
+    request: schemas.TournamentRequest,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """
+    Run a round robin or a single-elimination bracket between the Pokémon of the
+    given teams. Species stats are fetched once, the battles of each round are
+    played in parallel, and the tournament and all of its logs are saved in one transaction.
+    """
+    teams = await get_owned_teams(db, current_user, request.team_ids)
+    entrants = [
+        {"team_id": team.id, "team_name": team.name, "name": pokemon.name}
+        for team in teams
+        for pokemon in team.pokemons
+    ]
+    if len(entrants) < 2:
+        raise HTTPException(status_code=400, detail="A tournament needs at least two Pokémon.")
 
-    return {"winner": winner_name, "log": battle_log, "p1_stats": p1_stats, "p2_stats": p2_stats, "id": db_log.id, "timestamp": db_log.timestamp}
\ No newline at end of file
+    stats_by_name = await get_stats_for({entrant["name"] for entrant in entrants})
+    stats = [stats_by_name[entrant["name"].lower()] for entrant in entrants]
+
+    played = [] # (round, entrant1, entrant2, winner entrant, battle log row)
+
+    async def play(matches: list[tuple[int, int, int]]) -> list[int]:
+        """Play (round, entrant1, entrant2) battles together. Returns the winning entrants."""
+        seeds = [battle_engine.new_seed() for _ in matches]
+        results = await tournament.play_all([(stats[a], stats[b], seed) for (_, a, b), seed in zip(matches, seeds)])
+        winners = []
+        for (number, a, b), seed, (winner, events) in zip(matches, seeds, results):
+            metrics.BATTLE_TURNS.observe(len(events) // battle_engine.EVENT.size, "tournament")
+            winners.append((a, b)[winner])
+            row = battle_row(stats[a], stats[b], stats[winners[-1]]["name"], events, seed, current_user.id)
+            played.append((number, a, b, winners[-1], {**row, "tournament_round": number}))
+        return winners
+
+    if request.format == "round_robin":
+        # Rounds don't depend on each other, so they are all played at once
+        rounds = tournament.round_robin(len(entrants))
+        await play([(number, a, b) for number, pairs in enumerate(rounds, start=1) for a, b in pairs])
+    else:
+        remaining = list(range(len(entrants)))
+        round_number = 1
+        while len(remaining) > 1:
+            pairs, bye = tournament.bracket_round(remaining)
+            winners = await play([(round_number, a, b) for a, b in pairs])
+            # Survivors keep their seeding for the next round
+            remaining = sorted(winners + ([bye] if bye is not None else []))
+            round_number += 1
+
+    standings = [
+        {**entrants[standing["entrant"]], **standing}
+        for standing in tournament.standings(len(entrants), [(a, b, winner) for _, a, b, winner, _ in played])
+    ]
+    rows = [row for *_, row in played]
+    tournament_id, timestamp, saved = await battle_store.save_tournament(db, {
+        "format": request.format,
+        "entrants": json.dumps(entrants),
+        "standings": json.dumps(standings),
+        "user_id": current_user.id,
+    }, rows)
+
+    return {
+        "id": tournament_id,
+        "format": request.format,
+        "timestamp": timestamp,
+        "entrants": entrants,
+        "standings": standings,
+        "matches": [
+            {"round": row["tournament_round"], "battle_id": battle_id, **{k: row[k] for k in ("pokemon1_name", "pokemon2_name", "winner_name")}}
+            for row, (battle_id, _) in zip(rows, saved)
+        ],
+    }
+
+@router.post("/team", response_model=schemas.TeamBattleResult)
+async def run_team_battle(
+    request: schemas.TeamBattleRequest,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """Battle two teams with type effectiveness and matchup-based switching. Nothing is saved."""
+    teams, rosters = await get_rosters(db, current_user, request.team1_id, request.team2_id)
+    seed = battle_engine.new_seed()
+    result = matchups.play_team_battle((teams[0].name, teams[1].name), rosters, seed)
+    metrics.BATTLE_TURNS.observe(result["turns"], "team")
+    winner = teams[result["winner"]]
+    return {
+        "winner": winner.name,
+        "winner_team_id": winner.id,
+        "seed": seed,
+        "team1_order": result["order"][0],
+        "team2_order": result["order"][1],
+        "team1_remaining_hp": result["remaining_hp"][0],
+        "team2_remaining_hp": result["remaining_hp"][1],
+        "log": result["log"],
+    }
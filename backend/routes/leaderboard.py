@@ -0,0 +1,49 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, database, auth, schemas
+
+router = APIRouter()
+
+MAX_LEADERBOARD = 100
+
+@router.get("/species", response_model=list[schemas.SpeciesRecord])
+async def species_leaderboard(
+    sort: Literal["wins", "battles"] = "wins",
+    limit: int = Query(10, ge=1, le=MAX_LEADERBOARD),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Top species by wins or by battles fought, across all users."""
+    column = getattr(models.SpeciesRecord, sort)
+    query = select(models.SpeciesRecord).order_by(desc(column), models.SpeciesRecord.name).limit(limit)
+    return (await db.execute(query)).scalars().all()
+
+@router.get("/users", response_model=list[schemas.UserRecord])
+async def user_leaderboard(
+    limit: int = Query(10, ge=1, le=MAX_LEADERBOARD),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Top users by battles fought."""
+    query = (
+        select(models.UserRecord.user_id, models.User.username, models.UserRecord.battles)
+        .join(models.User, models.User.id == models.UserRecord.user_id)
+        .order_by(desc(models.UserRecord.battles), models.UserRecord.user_id)
+        .limit(limit)
+    )
+    return [row._asdict() for row in await db.execute(query)]
+
+@router.get("/me", response_model=schemas.MyRecord)
+async def my_record(
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """The current user's battle count and per-species record."""
+    record = await db.get(models.UserRecord, current_user.id)
+    query = (
+        select(models.UserSpeciesRecord)
+        .where(models.UserSpeciesRecord.user_id == current_user.id)
+        .order_by(desc(models.UserSpeciesRecord.wins), models.UserSpeciesRecord.name)
+    )
+    species = (await db.execute(query)).scalars().all()
+    return {"battles": record.battles if record else 0, "species": species}
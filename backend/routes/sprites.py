@@ -0,0 +1,27 @@
+from typing import Literal, Optional
+import httpx
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse
+from .. import sprites, http_cache
+
+router = APIRouter()
+
+@router.get("/{kind}/{poke_id}.png")
+async def get_sprite(kind: Literal["default", "artwork"], poke_id: int, request: Request, size: Optional[int] = None):
+    """A species sprite, from the local cache. `size` picks one of the pre-generated thumbnail sizes."""
+    if size is not None and size not in sprites.THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {', '.join(map(str, sprites.THUMBNAIL_SIZES))}")
+    try:
+        digest = await sprites.get_sprite(kind, poke_id, size)
+    except httpx.HTTPError:
+        raise HTTPException(status_code=502, detail="Could not fetch the sprite")
+    if digest is None:
+        raise HTTPException(status_code=404, detail="Sprite not found")
+    etag = f'"{digest}"'
+    if http_cache.etag_matches(request, etag):
+        return http_cache.not_modified(etag, http_cache.PUBLIC_IMMUTABLE)
+    return FileResponse(
+        sprites.object_path(digest),
+        media_type="image/png",
+        headers={"ETag": etag, "Cache-Control": http_cache.PUBLIC_IMMUTABLE},
+    )
@@ -1,15 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import defer
-from backend import models, schemas, database, auth
+from backend import models, schemas, database, auth, queries, rosters
 
 router = APIRouter()
 
+def get_owned_team(db: Session, team_id: int, current_user: auth.CurrentUser) -> models.Team:
+    team = db.scalars(queries.team_by_id(team_id)).first()
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found.")
+    if team.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to edit this team")
+    return team
+
 @router.get("/", response_model=list[schemas.Team])
-def get_team(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+def get_team(db: Session = Depends(database.get_db), current_user: auth.CurrentUser = Depends(auth.get_current_user)):
     # The user_id column might not exist if the database is old.
     # We defer loading it to avoid an error, as it's not used here anyway.
-    team = db.query(models.Team).filter(models.Team.user_id == current_user.id).all()
+    team = db.scalars(queries.user_teams(current_user.id)).all()
     if not team:
         # If no teams, return an empty list. The frontend can handle this.
         # The logic to create a default team can be moved to the frontend or a dedicated endpoint if needed.
@@ -17,12 +26,12 @@ def get_team(db: Session = Depends(database.get_db), current_user: models.User =
     return team
 
 @router.get("/list", response_model=list[schemas.Team])
-def list_teams(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+def list_teams(db: Session = Depends(database.get_db), current_user: auth.CurrentUser = Depends(auth.get_current_user)):
     """List all teams."""
-    return db.query(models.Team).filter(models.Team.user_id == current_user.id).all()
+    return db.scalars(queries.user_teams(current_user.id)).all()
 
 @router.post("/create", response_model=schemas.Team)
-def create_team(team_data: schemas.TeamCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+def create_team(team_data: schemas.TeamCreate, db: Session = Depends(database.get_db), current_user: auth.CurrentUser = Depends(auth.get_current_user)):
     """Create a new team."""
     new_team = models.Team(name=team_data.name, user_id=current_user.id)
     db.add(new_team)
@@ -30,10 +39,76 @@ def create_team(team_data: schemas.TeamCreate, db: Session = Depends(database.ge
     db.refresh(new_team)
     return new_team
 
+@router.post("/import", response_model=list[schemas.Team])
+def import_teams(request: schemas.TeamImport, db: Session = Depends(database.get_db), current_user: auth.CurrentUser = Depends(auth.get_current_user)):
+    """
+    Create teams from saved rosters, or replace existing ones given their id,
+    all in one transaction.
+    """
+    for item in request.teams:
+        rosters.validate([p.name for p in item.pokemons], item.name)
+    existing_ids = [item.id for item in request.teams if item.id is not None]
+    if len(set(existing_ids)) != len(existing_ids):
+        raise HTTPException(status_code=400, detail="The same team is imported more than once.")
+    existing = {team.id: team for team in db.scalars(queries.teams_by_ids(existing_ids))} if existing_ids else {}
+    if len(existing) != len(existing_ids):
+        raise HTTPException(status_code=404, detail="Team not found.")
+    if any(team.user_id != current_user.id for team in existing.values()):
+        raise HTTPException(status_code=403, detail="Not authorized to edit this team")
+
+    pokemon_ids = rosters.upsert_pokemons(db, [p.model_dump() for item in request.teams for p in item.pokemons])
+    new_teams = [{"name": item.name, "user_id": current_user.id} for item in request.teams if item.id is None]
+    created = iter(())
+    if new_teams:
+        stmt = insert(models.Team).returning(models.Team.id, sort_by_parameter_order=True)
+        created = iter(db.execute(stmt, new_teams).scalars().all())
+    team_ids = [item.id if item.id is not None else next(created) for item in request.teams]
+    for item in request.teams:
+        if item.id is not None:
+            existing[item.id].name = item.name
+    rosters.set_memberships(
+        db,
+        existing_ids,
+        {team_id: [pokemon_ids[p.name] for p in item.pokemons] for team_id, item in zip(team_ids, request.teams)},
+    )
+    db.commit()
+    teams = {team.id: team for team in db.scalars(queries.teams_by_ids(team_ids).execution_options(populate_existing=True))}
+    return [teams[team_id] for team_id in team_ids]
+
+@router.put("/{team_id}/pokemons", response_model=schemas.Team)
+def replace_roster(team_id: int, pokemons: list[schemas.PokemonCreate], db: Session = Depends(database.get_db), current_user: auth.CurrentUser = Depends(auth.get_current_user)):
+    """Replace a team's whole roster in one request."""
+    team = get_owned_team(db, team_id, current_user)
+    rosters.validate([p.name for p in pokemons])
+    pokemon_ids = rosters.upsert_pokemons(db, [p.model_dump() for p in pokemons])
+    rosters.set_memberships(db, [team.id], {team.id: [pokemon_ids[p.name] for p in pokemons]})
+    db.commit()
+    return db.scalars(queries.team_by_id(team.id).execution_options(populate_existing=True)).first()
+
+@router.patch("/{team_id}/pokemons", response_model=schemas.Team)
+def patch_roster(team_id: int, patch: schemas.RosterPatch, db: Session = Depends(database.get_db), current_user: auth.CurrentUser = Depends(auth.get_current_user)):
+    """Add and remove several Pokémon in one request. Removals apply first."""
+    team = get_owned_team(db, team_id, current_user)
+    current = {p.name: p.id for p in team.pokemons}
+    missing = [name for name in patch.remove if name not in current]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Pokemon not found in this team: {', '.join(missing)}")
+    kept = [name for name in current if name not in set(patch.remove)]
+    rosters.validate(kept + [p.name for p in patch.add])
+    pokemon_ids = rosters.upsert_pokemons(db, [p.model_dump() for p in patch.add])
+    rosters.set_memberships(
+        db,
+        [team.id],
+        {team.id: [pokemon_ids[p.name] for p in patch.add]},
+        remove={team.id: [current[name] for name in patch.remove]},
+    )
+    db.commit()
+    return db.scalars(queries.team_by_id(team.id).execution_options(populate_existing=True)).first()
+
 @router.put("/{team_id}", response_model=schemas.Team)
-def update_team(team_id: int, team_data: schemas.TeamCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+def update_team(team_id: int, team_data: schemas.TeamCreate, db: Session = Depends(database.get_db), current_user: auth.CurrentUser = Depends(auth.get_current_user)):
     """Update a team's name."""
-    team = db.query(models.Team).filter(models.Team.id == team_id).first()
+    team = db.scalars(queries.team_by_id(team_id)).first()
     if not team:
         raise HTTPException(status_code=404, detail="Team not found.")
     team.name = team_data.name
@@ -42,9 +117,9 @@ def update_team(team_id: int, team_data: schemas.TeamCreate, db: Session = Depen
     return team
 
 @router.delete("/{team_id}", status_code=204)
-def delete_team(team_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+def delete_team(team_id: int, db: Session = Depends(database.get_db), current_user: auth.CurrentUser = Depends(auth.get_current_user)):
     """Delete a team."""
-    team = db.query(models.Team).filter(models.Team.id == team_id).first()
+    team = db.scalars(queries.team_by_id(team_id)).first()
     if not team:
         raise HTTPException(status_code=404, detail="Team not found.")
     
@@ -56,8 +131,8 @@ def delete_team(team_id: int, db: Session = Depends(database.get_db), current_us
     db.commit()
 
 @router.post("/{team_id}/add", response_model=schemas.Team)
-def add_pokemon(team_id: int, pokemon: schemas.PokemonCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    team = db.query(models.Team).filter(models.Team.id == team_id).first()
+def add_pokemon(team_id: int, pokemon: schemas.PokemonCreate, db: Session = Depends(database.get_db), current_user: auth.CurrentUser = Depends(auth.get_current_user)):
+    team = db.scalars(queries.team_by_id(team_id)).first()
     if not team:
         raise HTTPException(status_code=404, detail="Team not found.")
     if len(team.pokemons) >= 6:
@@ -82,8 +157,8 @@ def add_pokemon(team_id: int, pokemon: schemas.PokemonCreate, db: Session = Depe
     return team
 
 @router.delete("/{team_id}/remove/{name}", response_model=schemas.Team)
-def remove_pokemon(team_id: int, name: str, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    team = db.query(models.Team).filter(models.Team.id == team_id).first()
+def remove_pokemon(team_id: int, name: str, db: Session = Depends(database.get_db), current_user: auth.CurrentUser = Depends(auth.get_current_user)):
+    team = db.scalars(queries.team_by_id(team_id)).first()
     if not team:
         raise HTTPException(status_code=404, detail="Team not found.")
 
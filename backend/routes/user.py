@@ -1,32 +1,48 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from .. import models, schemas, database, auth
+from .. import models, schemas, database, auth, hashing
 
 router = APIRouter()
 
+def _find_user(db: Session, username: str):
+    return db.query(models.User).filter(models.User.username == username).first()
+
+def _save(db: Session, obj):
+    db.add(obj)
+    db.commit()
+    db.refresh(obj)
+    return obj
+
+# Login and register are async so that bcrypt runs in the hashing process pool
+# without holding a threadpool thread; the short DB calls go to the threadpool.
 @router.post("/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
+async def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+    db_user = await run_in_threadpool(_find_user, db, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    hashed_password = auth.get_password_hash(user.password)
+    hashed_password = await hashing.hash_password(user.password)
     db_user = models.User(username=user.username, hashed_password=hashed_password)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    return await run_in_threadpool(_save, db, db_user)
 
 @router.post("/login")
-def login_for_access_token(response: Response, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(response: Response, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+    user = await run_in_threadpool(_find_user, db, form_data.username)
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await hashing.verify_password(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = auth.create_access_token(data={"sub": user.username})
+    if new_hash:
+        # The stored hash used outdated cost parameters
+        user.hashed_password = new_hash
+        await run_in_threadpool(_save, db, user)
+    access_token = auth.create_access_token_for(user)
     response.set_cookie(
         key="access_token",
         value=f"Bearer {access_token}",
@@ -37,7 +53,7 @@ def login_for_access_token(response: Response, form_data: OAuth2PasswordRequestF
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=schemas.User)
-def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
+def read_users_me(current_user: auth.CurrentUser = Depends(auth.get_current_user)):
     return current_user
 
 @router.post("/promote/{username}", response_model=schemas.User, dependencies=[Depends(auth.require_admin_or_no_admins_exist)])
@@ -48,6 +64,8 @@ def promote_user_to_admin(username: str, db: Session = Depends(database.get_db))
     user_to_promote.role = "admin"
     db.commit()
     db.refresh(user_to_promote)
+    auth.invalidate_user(user_to_promote.id)
+    auth.invalidate_admins_exist()
     return user_to_promote
 
 @router.post("/demote/{username}", response_model=schemas.User, dependencies=[Depends(auth.require_admin)])
@@ -61,4 +79,6 @@ def demote_user_from_admin(username: str, db: Session = Depends(database.get_db)
     user_to_demote.role = "normal"
     db.commit()
     db.refresh(user_to_demote)
+    auth.invalidate_user(user_to_demote.id)
+    auth.invalidate_admins_exist()
     return user_to_demote
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, field_validator
-from typing import List, Optional, Any
+from pydantic import BaseModel, Field, computed_field, field_validator
+from typing import List, Literal, Optional, Any
 from datetime import datetime
 import json
 
@@ -48,6 +48,14 @@ class Team(TeamBase):
         "from_attributes": True  
     }
 
+class BattleLogSummary(BaseModel):
+    id: int
+    pokemon1_name: str
+    pokemon2_name: str
+    winner_name: str
+    timestamp: datetime
+    model_config = {"from_attributes": True}
+
 class BattleLogBase(BaseModel):
     pokemon1_name: str
     pokemon2_name: str
@@ -85,6 +93,27 @@ class BattleLogDetails(BattleLog):
                 return {}
         return v
 
+class BattleEvents(BaseModel):
+    id: int
+    seed: Optional[int] = None
+    pokemon1_stats: dict[str, Any]
+    pokemon2_stats: dict[str, Any]
+    events: list[tuple[int, int, int]] # (attacker, damage, defender remaining hp), attacker 0 is pokemon 1
+
+    @field_validator('pokemon1_stats', 'pokemon2_stats', mode='before')
+    @classmethod
+    def parse_stats(cls, v: Any) -> Any:
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
+
+class BattleMatchup(BaseModel):
+    pokemon1: str
+    pokemon2: str
+
+class BatchBattleRequest(BaseModel):
+    matchups: list[BattleMatchup] = Field(min_length=1, max_length=100)
+
 class BattleResponse(BaseModel):
     id: int
     winner: str
@@ -92,3 +121,116 @@ class BattleResponse(BaseModel):
     p1_stats: dict
     p2_stats: dict
     timestamp: datetime
+
+class SimulationTurns(BaseModel):
+    mean: float
+    min: int
+    max: int
+    p50: float
+    p90: float
+    distribution: dict[int, float] # turn count -> share of battles
+
+class SimulationResult(BaseModel):
+    pokemon1: str
+    pokemon2: str
+    battles: int
+    first_attacker: str
+    pokemon1_win_probability: float
+    pokemon2_win_probability: float
+    turns: SimulationTurns
+    pokemon1_expected_remaining_hp: float
+    pokemon2_expected_remaining_hp: float
+    pokemon1_expected_remaining_hp_when_winning: float
+    pokemon2_expected_remaining_hp_when_winning: float
+
+class SpeciesRecord(BaseModel):
+    name: str
+    wins: int
+    losses: int
+    battles: int
+    model_config = {"from_attributes": True}
+
+    @computed_field
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.battles if self.battles else 0.0
+
+class UserRecord(BaseModel):
+    user_id: int
+    username: str
+    battles: int
+
+class MyRecord(BaseModel):
+    battles: int
+    species: list[SpeciesRecord]
+
+class TournamentRequest(BaseModel):
+    team_ids: list[int] = Field(min_length=1, max_length=8)
+    format: Literal["round_robin", "bracket"] = "round_robin"
+
+class TournamentEntrant(BaseModel):
+    team_id: int
+    team_name: Optional[str] = None
+    name: str
+
+class TournamentStanding(TournamentEntrant):
+    rank: int
+    entrant: int # Index in the entrants list
+    wins: int
+    losses: int
+
+class TournamentMatch(BaseModel):
+    round: int
+    battle_id: int
+    pokemon1_name: str
+    pokemon2_name: str
+    winner_name: str
+
+class TournamentResult(BaseModel):
+    id: int
+    format: str
+    timestamp: datetime
+    entrants: list[TournamentEntrant]
+    standings: list[TournamentStanding]
+    matches: list[TournamentMatch]
+
+class MatchupPokemon(BaseModel):
+    name: str
+    types: list[str]
+
+class MatchupPreview(BaseModel):
+    team1: list[MatchupPokemon]
+    team2: list[MatchupPokemon]
+    # Indexed [team1 pokemon][team2 pokemon]
+    multiplier: list[list[float]] # Type multiplier of team1's attacks
+    damage: list[list[int]] # Expected damage per hit dealt by team1
+    damage_taken: list[list[int]] # Expected damage per hit dealt to team1
+    hits_to_ko: list[list[int]]
+    hits_to_be_ko: list[list[int]]
+    advantage: list[list[float]] # Positive favours team1
+
+class TeamBattleRequest(BaseModel):
+    team1_id: int
+    team2_id: int
+
+class TeamBattleResult(BaseModel):
+    winner: Optional[str] = None
+    winner_team_id: int
+    seed: int
+    team1_order: list[str] # Send-out order
+    team2_order: list[str]
+    team1_remaining_hp: list[int] # In roster order
+    team2_remaining_hp: list[int]
+    log: list[str]
+
+class RosterPatch(BaseModel):
+    add: list[PokemonCreate] = []
+    remove: list[str] = [] # Pokémon names
+
+class TeamImportItem(BaseModel):
+    id: Optional[int] = None # Replace this existing team instead of creating one
+    name: str
+    pokemons: list[PokemonCreate]
+
+class TeamImport(BaseModel):
+    teams: list[TeamImportItem] = Field(min_length=1, max_length=20)
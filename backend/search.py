@@ -0,0 +1,186 @@
+"""
+In-memory Pokédex search over the species snapshot.
+
+Indexes kept per species, all updated species by species:
+- names in sorted order, so a prefix is one bisect plus a slice (autocomplete)
+- name trigrams -> names, for fuzzy matches that tolerate typos and find substrings
+- type -> names
+- one sorted (value, id, name) column per base stat, so a range is two bisects
+
+The index is synced from the snapshot every time it is loaded. Only species
+that were added, removed or changed are reindexed, the rest stay in place.
+"""
+import bisect
+import re
+from collections import Counter
+from typing import Iterable, Optional
+
+from backend import sprites
+
+STATS = ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+# A fuzzy match contains at least this fraction of the query's trigrams
+FUZZY_THRESHOLD = 0.5
+MAX_RESULTS = 100
+
+_STAT_FILTER = re.compile(r"^([a-z-]+)(>=|<=|>|<|=)(\d+)$")
+
+
+def trigrams(name: str) -> set[str]:
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_stat_filter(spec: str) -> tuple[str, Optional[int], Optional[int]]:
+    """"speed>100" -> ("speed", 101, None): the stat and its inclusive bounds. Raises ValueError."""
+    match = _STAT_FILTER.match(spec.replace(" ", "").lower().replace("_", "-"))
+    if not match or match.group(1) not in STATS:
+        raise ValueError(f"Invalid stat filter {spec!r}, expected e.g. speed>100 with a stat among {', '.join(STATS)}")
+    stat, op, value = match.group(1), match.group(2), int(match.group(3))
+    low, high = {
+        ">": (value + 1, None), ">=": (value, None), "<": (None, value - 1), "<=": (None, value), "=": (value, value),
+    }[op]
+    return stat, low, high
+
+
+class SearchIndex:
+    def __init__(self):
+        self.records: dict[str, dict] = {}
+        self.items: dict[str, dict] = {}
+        self.names: list[str] = []
+        self.by_trigram: dict[str, set[str]] = {}
+        self.by_type: dict[str, set[str]] = {}
+        self.stat_columns: dict[str, list[tuple[int, int, str]]] = {stat: [] for stat in STATS}
+        self.by_id: list[tuple[int, str]] = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record: dict):
+        name = record["name"].lower()
+        if name in self.records:
+            self.remove(name)
+        self.records[name] = record
+        self.items[name] = {
+            "id": str(record["id"]),
+            "name": name.capitalize(),
+            "image": sprites.url("default", record["id"]),
+            "types": list(record["types"]),
+            "stats": {stat: record["stats"].get(stat, 1) for stat in STATS},
+        }
+        bisect.insort(self.names, name)
+        bisect.insort(self.by_id, (record["id"], name))
+        for trigram in trigrams(name):
+            self.by_trigram.setdefault(trigram, set()).add(name)
+        for type_name in record["types"]:
+            self.by_type.setdefault(type_name, set()).add(name)
+        for stat, column in self.stat_columns.items():
+            bisect.insort(column, (record["stats"].get(stat, 1), record["id"], name))
+
+    def remove(self, name: str):
+        record = self.records.pop(name, None)
+        if record is None:
+            return
+        del self.items[name]
+        _discard_sorted(self.names, name)
+        _discard_sorted(self.by_id, (record["id"], name))
+        for trigram in trigrams(name):
+            self.by_trigram[trigram].discard(name)
+        for type_name in record["types"]:
+            self.by_type[type_name].discard(name)
+        for stat, column in self.stat_columns.items():
+            _discard_sorted(column, (record["stats"].get(stat, 1), record["id"], name))
+
+    def sync(self, records: Iterable[dict]) -> int:
+        """Make the index hold exactly `records`, reindexing only what changed. Returns the species reindexed."""
+        incoming = {record["name"].lower(): record for record in records}
+        changed = 0
+        for name in [name for name in self.records if name not in incoming]:
+            self.remove(name)
+            changed += 1
+        for name, record in incoming.items():
+            if self.records.get(name) != record:
+                self.add(record)
+                changed += 1
+        return changed
+
+    def prefix(self, query: str) -> list[str]:
+        start = bisect.bisect_left(self.names, query)
+        end = bisect.bisect_left(self.names, query + "\uffff", start)
+        return self.names[start:end]
+
+    def fuzzy(self, query: str) -> list[str]:
+        """Names containing enough of the trigrams of `query`, best first."""
+        query_trigrams = trigrams(query)
+        shared = Counter(name for trigram in query_trigrams for name in self.by_trigram.get(trigram, ()))
+        scored = []
+        for name, count in shared.items():
+            # The share of the query found in the name, so substrings score well,
+            # then the Jaccard similarity, so closer lengths rank first
+            containment = count / len(query_trigrams)
+            if containment >= FUZZY_THRESHOLD:
+                similarity = count / (len(query_trigrams) + len(trigrams(name)) - count)
+                scored.append((-containment, -similarity, self.records[name]["id"], name))
+        return [name for *_, name in sorted(scored)]
+
+    def stat_range(self, stat: str, low: Optional[int], high: Optional[int]) -> set[str]:
+        column = self.stat_columns[stat]
+        start = bisect.bisect_left(column, (low,)) if low is not None else 0
+        end = bisect.bisect_left(column, (high + 1,)) if high is not None else len(column)
+        return {name for *_, name in column[start:end]}
+
+    def search(
+        self,
+        query: str = "",
+        fuzzy: bool = True,
+        types: Iterable[str] = (),
+        stat_filters: Iterable[tuple[str, Optional[int], Optional[int]]] = (),
+        sort: Optional[str] = None,
+        limit: int = 20,
+    ) -> dict:
+        """
+        Species matching every filter: the name query (prefix matches first,
+        then fuzzy ones), all of `types`, and every (stat, low, high) range.
+        Results are ordered by name match, or by id, or by `sort` stat, highest first.
+        """
+        allowed: Optional[set[str]] = None
+        filters = [self.by_type.get(type_name.lower(), set()) for type_name in types]
+        filters += [self.stat_range(*stat_filter) for stat_filter in stat_filters]
+        # Smallest set first keeps the intersections cheap
+        for names in sorted(filters, key=len):
+            allowed = set(names) if allowed is None else allowed & names
+            if not allowed:
+                break
+
+        query = query.strip().lower()
+        if query:
+            matches = self.prefix(query)
+            if fuzzy:
+                seen = set(matches)
+                matches = matches + [name for name in self.fuzzy(query) if name not in seen]
+            if allowed is not None:
+                matches = [name for name in matches if name in allowed]
+            if sort is not None:
+                matches = sorted(matches, key=lambda name: -self.items[name]["stats"][sort])
+        else:
+            # The stat columns and the id list are already in order
+            ordered = (name for *_, name in reversed(self.stat_columns[sort])) if sort else (name for _, name in self.by_id)
+            matches = [name for name in ordered if allowed is None or name in allowed]
+        return {"count": len(matches), "results": [self.items[name] for name in matches[:limit]]}
+
+
+def _discard_sorted(values: list, value):
+    i = bisect.bisect_left(values, value)
+    if i < len(values) and values[i] == value:
+        del values[i]
+
+
+_index = SearchIndex()
+
+
+def sync(records: Iterable[dict]) -> int:
+    """Update the index to the species in `records`. Returns the species reindexed."""
+    return _index.sync(records)
+
+
+def search(*args, **kwargs) -> dict:
+    return _index.search(*args, **kwargs)
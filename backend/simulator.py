@@ -0,0 +1,72 @@
+"""
+Vectorized Monte Carlo matchup simulator.
+
+Plays N independent battles between two Pokémon at once with NumPy, using the
+same rules as `run_battle`: the faster Pokémon attacks first (ties go to the
+first Pokémon), attacks alternate, and each hit deals
+max(1, round(attack / defense * 10 * uniform(0.9, 1.1))).
+"""
+from typing import Optional
+
+import numpy as np
+
+
+def simulate(p1_stats: dict, p2_stats: dict, n: int, seed: Optional[int] = None) -> dict:
+    rng = np.random.default_rng(seed)
+    first, second = (0, 1) if p1_stats["speed"] >= p2_stats["speed"] else (1, 0)
+    stats = (p1_stats, p2_stats)
+    # Base damage each side deals to the other before the random roll
+    base_damage = (
+        p1_stats["attack"] / p2_stats["defense"] * 10,
+        p2_stats["attack"] / p1_stats["defense"] * 10,
+    )
+
+    hp = np.empty((2, n), dtype=np.int64)
+    hp[0] = p1_stats["hp"]
+    hp[1] = p2_stats["hp"]
+    winners = np.empty(n, dtype=np.int8)
+    turns = np.empty(n, dtype=np.int64)
+
+    # Indices of battles still running; shrinks as battles finish
+    active = np.arange(n)
+    turn = 0
+    while active.size:
+        attacker = first if turn % 2 == 0 else second
+        defender = 1 - attacker
+        rolls = rng.uniform(0.9, 1.1, size=active.size)
+        damage = np.maximum(1, np.rint(base_damage[attacker] * rolls)).astype(np.int64)
+        hp[defender, active] -= damage
+        turn += 1
+
+        finished = hp[defender, active] <= 0
+        done = active[finished]
+        winners[done] = attacker
+        turns[done] = turn
+        active = active[~finished]
+
+    remaining = np.maximum(hp, 0)
+    p1_wins = winners == 0
+    p1_win_count = int(p1_wins.sum())
+    p2_win_count = n - p1_win_count
+
+    turn_values, turn_counts = np.unique(turns, return_counts=True)
+    return {
+        "pokemon1": p1_stats["name"],
+        "pokemon2": p2_stats["name"],
+        "battles": n,
+        "first_attacker": stats[first]["name"],
+        "pokemon1_win_probability": p1_win_count / n,
+        "pokemon2_win_probability": p2_win_count / n,
+        "turns": {
+            "mean": float(turns.mean()),
+            "min": int(turns.min()),
+            "max": int(turns.max()),
+            "p50": float(np.percentile(turns, 50)),
+            "p90": float(np.percentile(turns, 90)),
+            "distribution": {int(t): int(c) / n for t, c in zip(turn_values, turn_counts)},
+        },
+        "pokemon1_expected_remaining_hp": float(remaining[0].mean()),
+        "pokemon2_expected_remaining_hp": float(remaining[1].mean()),
+        "pokemon1_expected_remaining_hp_when_winning": float(remaining[0, p1_wins].mean()) if p1_win_count else 0.0,
+        "pokemon2_expected_remaining_hp_when_winning": float(remaining[1, ~p1_wins].mean()) if p2_win_count else 0.0,
+    }
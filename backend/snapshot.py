@@ -0,0 +1,211 @@
+"""
+Offline species snapshot.
+
+Species data (id, name, types, base stats, sprite) is imported once into the
+`species` table and loaded into memory at startup, so the Pokédex and battle
+stat lookups can be answered without calling PokeAPI. Loading it also syncs
+the Pokédex search indexes (see search.py).
+
+Usage:
+    python -m backend.snapshot import                   # pull everything from PokeAPI
+    python -m backend.snapshot import --from-json dump.json
+    python -m backend.snapshot export dump.json         # write the current snapshot as JSON
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from backend import models, database, pokeapi, sprites, search
+
+STAT_COLUMNS = {
+    "hp": "hp",
+    "attack": "attack",
+    "defense": "defense",
+    "special-attack": "special_attack",
+    "special-defense": "special_defense",
+    "speed": "speed",
+}
+
+
+class SpeciesIndex:
+    """In-memory view of the snapshot, with the API responses prebuilt."""
+
+    def __init__(self, records: list[dict]):
+        self.records = sorted(records, key=lambda r: r["id"])
+        self.by_name = {r["name"]: r for r in self.records}
+        self.list_items = [
+            {"id": str(r["id"]), "name": r["name"].capitalize(), "image": sprites.url("default", r["id"])}
+            for r in self.records
+        ]
+        self.details = {r["name"]: _detail(r) for r in self.records}
+        # Changes whenever the imported data does; used as the Pokédex ETag
+        self.version = hashlib.sha1(json.dumps([self.records, sprites.SPRITE_BASE_URL], sort_keys=True).encode()).hexdigest()[:16]
+
+    def __len__(self):
+        return len(self.records)
+
+
+_index: Optional[SpeciesIndex] = None
+
+
+def _detail(record: dict) -> dict:
+    return {
+        "id": record["id"],
+        "name": record["name"].capitalize(),
+        "height": record["height"],
+        "weight": record["weight"],
+        "types": list(record["types"]),
+        "stats": dict(record["stats"]),
+        "image": sprites.url("artwork", record["id"]),
+    }
+
+
+def record_from_payload(data: dict) -> dict:
+    """Flatten a PokeAPI /pokemon/{name} payload into a snapshot record."""
+    return {
+        "id": data["id"],
+        "name": data["name"],
+        "types": [t["type"]["name"] for t in sorted(data["types"], key=lambda t: t.get("slot", 0))],
+        "stats": {s["stat"]["name"]: s["base_stat"] for s in data["stats"]},
+        "height": data.get("height"),
+        "weight": data.get("weight"),
+        "image": data["sprites"]["other"]["official-artwork"]["front_default"],
+    }
+
+
+def record_from_row(row: models.Species) -> dict:
+    return {
+        "id": row.id,
+        "name": row.name,
+        "types": row.types.split(",") if row.types else [],
+        "stats": {stat: getattr(row, column) for stat, column in STAT_COLUMNS.items()},
+        "height": row.height,
+        "weight": row.weight,
+        "image": row.image,
+    }
+
+
+def row_values(record: dict) -> dict:
+    values = {
+        "id": record["id"],
+        "name": record["name"].lower(),
+        "types": ",".join(record["types"]),
+        "height": record.get("height"),
+        "weight": record.get("weight"),
+        "image": record.get("image"),
+    }
+    for stat, column in STAT_COLUMNS.items():
+        values[column] = record["stats"].get(stat, 1)
+    return values
+
+
+def read(db: Session) -> tuple[list[dict], Optional[SpeciesIndex]]:
+    """Read the snapshot table and build its index, without installing it. Safe to run in a thread."""
+    records = [record_from_row(row) for row in db.query(models.Species).all()]
+    return records, SpeciesIndex(records) if records else None
+
+
+def install(records: list[dict], index: Optional[SpeciesIndex]) -> int:
+    """Serve a snapshot returned by `read` and sync the search indexes. Returns the number of species."""
+    global _index
+    _index = index
+    search.sync(records)
+    return len(records)
+
+
+def load(db: Session) -> int:
+    """Load the snapshot table into memory. Returns the number of species loaded."""
+    return install(*read(db))
+
+
+def is_loaded() -> bool:
+    return _index is not None
+
+
+def version() -> Optional[str]:
+    """Content hash of the loaded snapshot, or None."""
+    return _index.version if _index else None
+
+
+def get(name: str) -> Optional[dict]:
+    """Snapshot record for a species name, or None."""
+    return _index.by_name.get(name.lower()) if _index else None
+
+
+def get_detail(name: str) -> Optional[dict]:
+    return _index.details.get(name.lower()) if _index else None
+
+
+def page(limit: int, offset: int) -> dict:
+    """Same shape as the upstream paginated list, sliced from the local index."""
+    offset = max(offset, 0)
+    limit = max(limit, 0)
+    return {"count": len(_index), "results": _index.list_items[offset:offset + limit]}
+
+
+def save(db: Session, records: list[dict]):
+    """Replace the snapshot table with `records` in a single transaction."""
+    db.query(models.Species).delete()
+    db.bulk_insert_mappings(models.Species, [row_values(r) for r in records])
+    db.commit()
+
+
+async def fetch_all(concurrency: int = 20) -> list[dict]:
+    """Pull every species from PokeAPI through the shared client."""
+    await pokeapi.startup()
+    try:
+        listing = await pokeapi.get_json("pokemon?limit=100000&offset=0")
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(name: str):
+            async with semaphore:
+                return await pokeapi.get_pokemon(name)
+
+        payloads = await asyncio.gather(*[fetch(p["name"]) for p in listing["results"]])
+    finally:
+        await pokeapi.shutdown()
+    return [record_from_payload(p) for p in payloads if p is not None]
+
+
+def read_dump(path: str) -> list[dict]:
+    """
+    Read a local JSON dump: a list of either raw PokeAPI /pokemon payloads
+    or records in the format written by `export`.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    return [record_from_payload(item) if isinstance(item.get("stats"), list) else item for item in items]
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m backend.snapshot", description="Manage the offline species snapshot.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Import species into the snapshot table.")
+    import_parser.add_argument("--from-json", dest="from_json", help="Read species from a local JSON dump instead of PokeAPI.")
+    import_parser.add_argument("--concurrency", type=int, default=20, help="Parallel upstream requests.")
+    export_parser = subparsers.add_parser("export", help="Write the snapshot table as a JSON dump.")
+    export_parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        if args.command == "import":
+            records = read_dump(args.from_json) if args.from_json else asyncio.run(fetch_all(args.concurrency))
+            save(db, records)
+            print(f"Imported {len(records)} species.")
+        else:
+            records = [record_from_row(row) for row in db.query(models.Species).order_by(models.Species.id)]
+            with open(args.path, "w", encoding="utf-8") as f:
+                json.dump(records, f)
+            print(f"Exported {len(records)} species to {args.path}.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Sprite proxy with a content-addressed disk cache.
+
+Each sprite is fetched from SPRITE_ORIGIN once and stored under its SHA-256
+in SPRITE_CACHE_DIR/objects. A small ref file per (kind, id, size) points at
+the object, so identical images are stored once. Thumbnails are resized from
+the cached original and stored the same way. The files are served with
+`FileResponse`, which hands the path to the server when it supports the ASGI
+pathsend extension (zero-copy) and streams it in chunks otherwise.
+
+Sprites can be fetched and thumbnails generated ahead of time:
+
+    python -m backend.sprites warm --ids 1-151 --sizes 96
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import os
+import tempfile
+from typing import Optional
+
+import httpx
+from PIL import Image
+
+SPRITE_ORIGIN = os.getenv("SPRITE_ORIGIN", "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon")
+SPRITE_CACHE_DIR = os.getenv("SPRITE_CACHE_DIR", "./.sprite_cache")
+# Where clients reach the sprite routes, used for the image URLs in API responses
+SPRITE_BASE_URL = os.getenv("SPRITE_BASE_URL", "http://localhost:9000/api/sprites")
+THUMBNAIL_SIZES = tuple(int(size) for size in os.getenv("SPRITE_THUMBNAIL_SIZES", "48,96,192").split(","))
+REQUEST_TIMEOUT = float(os.getenv("SPRITE_TIMEOUT", 10))
+
+# kind -> path under SPRITE_ORIGIN
+KINDS = {
+    "default": "{id}.png",
+    "artwork": "other/official-artwork/{id}.png",
+}
+
+_client: Optional[httpx.AsyncClient] = None
+# (kind, id, size) -> digest, for every sprite looked up so far
+_refs: dict[tuple[str, int, Optional[int]], str] = {}
+_inflight: dict[tuple[str, int, Optional[int]], asyncio.Task] = {}
+
+
+def url(kind: str, poke_id) -> str:
+    return f"{SPRITE_BASE_URL}/{kind}/{poke_id}.png"
+
+
+async def startup(transport: Optional[httpx.AsyncBaseTransport] = None):
+    """Create the app-lifetime origin client. Call once from the app lifespan."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = httpx.AsyncClient(base_url=SPRITE_ORIGIN, transport=transport, timeout=REQUEST_TIMEOUT)
+
+
+async def shutdown():
+    global _client
+    for task in list(_inflight.values()):
+        task.cancel()
+    _inflight.clear()
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def object_path(digest: str) -> str:
+    return os.path.join(SPRITE_CACHE_DIR, "objects", digest[:2], f"{digest}.png")
+
+
+def _ref_path(kind: str, poke_id: int, size: Optional[int]) -> str:
+    return os.path.join(SPRITE_CACHE_DIR, "refs", f"{kind}-{size or 'full'}", str(poke_id))
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A unique temp file per write, concurrent writers of the same path run in threads
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+def _read_ref(kind: str, poke_id: int, size: Optional[int]) -> Optional[str]:
+    try:
+        with open(_ref_path(kind, poke_id, size), "r", encoding="ascii") as f:
+            digest = f.read().strip()
+    except OSError:
+        return None
+    return digest if os.path.exists(object_path(digest)) else None
+
+
+def _store(kind: str, poke_id: int, size: Optional[int], data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    if not os.path.exists(object_path(digest)):
+        try:
+            _write_atomic(object_path(digest), data)
+        except OSError:
+            # Objects are named by their content, one stored by another writer is just as good
+            if not os.path.exists(object_path(digest)):
+                raise
+    _write_atomic(_ref_path(kind, poke_id, size), digest.encode("ascii"))
+    return digest
+
+
+def _thumbnail(path: str, size: int) -> bytes:
+    """Scale an image down to fit in size x size, keeping its aspect ratio."""
+    with Image.open(path) as image:
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+async def _fetch(kind: str, poke_id: int) -> Optional[bytes]:
+    if _client is None:
+        raise RuntimeError("Sprite client is not started. Call sprites.startup() first.")
+    response = await _client.get("/" + KINDS[kind].format(id=poke_id))
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.content
+
+
+async def _load(kind: str, poke_id: int, size: Optional[int]) -> Optional[str]:
+    if size is None:
+        data = await _fetch(kind, poke_id)
+    else:
+        original = await get_sprite(kind, poke_id)
+        data = await asyncio.to_thread(_thumbnail, object_path(original), size) if original else None
+    if data is None:
+        return None
+    return await asyncio.to_thread(_store, kind, poke_id, size, data)
+
+
+async def get_sprite(kind: str, poke_id: int, size: Optional[int] = None) -> Optional[str]:
+    """
+    Digest of the cached sprite, fetching it or generating the thumbnail first
+    if needed. Returns None when the origin has no such sprite.
+    """
+    key = (kind, poke_id, size)
+    digest = _refs.get(key)
+    if digest is None:
+        digest = await asyncio.to_thread(_read_ref, *key)
+    if digest is None:
+        # Concurrent misses share one fetch
+        task = _inflight.get(key)
+        if task is None:
+            task = _inflight[key] = asyncio.create_task(_load(*key))
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        digest = await asyncio.shield(task)
+    if digest is not None:
+        _refs[key] = digest
+    return digest
+
+
+def parse_ids(spec: str) -> list[int]:
+    """"1-151,251" -> [1, ..., 151, 251]"""
+    ids = []
+    for part in spec.split(","):
+        first, _, last = part.partition("-")
+        ids.extend(range(int(first), int(last or first) + 1))
+    return ids
+
+
+async def warm(ids: list[int], kinds: list[str], sizes: list[int], concurrency: int = 20) -> tuple[int, int]:
+    """Fetch sprites and generate their thumbnails. Returns (found, missing)."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(kind: str, poke_id: int) -> bool:
+        async with semaphore:
+            if await get_sprite(kind, poke_id) is None:
+                return False
+            for size in sizes:
+                await get_sprite(kind, poke_id, size)
+            return True
+
+    await startup()
+    try:
+        results = await asyncio.gather(*[one(kind, poke_id) for kind in kinds for poke_id in ids])
+    finally:
+        await shutdown()
+    found = sum(results)
+    return found, len(results) - found
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m backend.sprites", description="Manage the sprite cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    warm_parser = subparsers.add_parser("warm", help="Fetch sprites and generate thumbnails ahead of time.")
+    warm_parser.add_argument("--ids", type=parse_ids, default=parse_ids("1-151"), help='Species ids, e.g. "1-151,251".')
+    warm_parser.add_argument("--kinds", type=lambda s: s.split(","), default=list(KINDS))
+    warm_parser.add_argument("--sizes", type=lambda s: [int(size) for size in s.split(",")], default=list(THUMBNAIL_SIZES))
+    args = parser.parse_args(argv)
+
+    unknown = set(args.kinds) - set(KINDS)
+    if unknown:
+        parser.error(f"unknown kinds: {', '.join(sorted(unknown))}")
+    found, missing = asyncio.run(warm(args.ids, args.kinds, args.sizes))
+    print(f"Cached {found} sprites in {SPRITE_CACHE_DIR}, {missing} not found at the origin.")
+
+
+if __name__ == "__main__":
+    main()
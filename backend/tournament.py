@@ -0,0 +1,93 @@
+"""
+Tournaments between the Pokémon of one or more team rosters.
+
+A round robin plays every pairing of entrants once; a bracket is a single
+elimination where the winners of each round meet in the next. All the battles
+of a round are independent, so they are played together: in a thread when
+there are few of them, and split across a pool of worker processes when
+there are at least TOURNAMENT_PARALLEL_MIN.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend import battle_engine
+
+TOURNAMENT_WORKERS = int(os.getenv("TOURNAMENT_WORKERS", os.cpu_count() or 1))
+# Below this many battles, starting work in other processes costs more than it saves
+PARALLEL_MIN_BATTLES = int(os.getenv("TOURNAMENT_PARALLEL_MIN", 64))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn rather than fork: the server process has threads and an event loop running
+        _executor = ProcessPoolExecutor(max_workers=TOURNAMENT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def play_all(matches: list[tuple[dict, dict, int]]) -> list[tuple[int, bytes]]:
+    """Play (p1_stats, p2_stats, seed) battles. Returns (winner_index, packed events) per battle, in order."""
+    if len(matches) < PARALLEL_MIN_BATTLES or TOURNAMENT_WORKERS < 2:
+        return await run_in_threadpool(battle_engine.play_many, matches)
+    size = -(-len(matches) // TOURNAMENT_WORKERS)
+    chunks = [matches[i:i + size] for i in range(0, len(matches), size)]
+    executor = get_executor()
+    results = await asyncio.gather(*[asyncio.wrap_future(executor.submit(battle_engine.play_many, c)) for c in chunks])
+    return [result for chunk in results for result in chunk]
+
+
+def round_robin(count: int) -> list[list[tuple[int, int]]]:
+    """
+    Every pairing of `count` entrants, grouped in rounds where each entrant
+    fights at most once (circle method).
+    """
+    slots: list[Optional[int]] = list(range(count))
+    if count % 2:
+        slots.append(None) # Bye
+    rounds = []
+    for _ in range(len(slots) - 1):
+        half = len(slots) // 2
+        pairs = [(a, b) for a, b in zip(slots[:half], reversed(slots[half:])) if a is not None and b is not None]
+        rounds.append(pairs)
+        # Keep the first slot fixed and rotate the others
+        slots = [slots[0], slots[-1]] + slots[1:-1]
+    return rounds
+
+
+def bracket_round(seeds: list[int]) -> tuple[list[tuple[int, int]], Optional[int]]:
+    """
+    Pair the remaining entrants of a bracket, best seed against worst.
+    Returns (pairs, entrant with a bye); the top seed gets the bye when the count is odd.
+    """
+    bye = seeds[0] if len(seeds) % 2 else None
+    rest = seeds[1:] if bye is not None else seeds
+    half = len(rest) // 2
+    return list(zip(rest[:half], reversed(rest[half:]))), bye
+
+
+def standings(count: int, results: list[tuple[int, int, int]]) -> list[dict]:
+    """
+    Rank entrants from (entrant1, entrant2, winner) results: most wins first,
+    then fewest losses, then entry order.
+    """
+    wins = [0] * count
+    losses = [0] * count
+    for entrant1, entrant2, winner in results:
+        wins[winner] += 1
+        losses[entrant2 if winner == entrant1 else entrant1] += 1
+    order = sorted(range(count), key=lambda e: (-wins[e], losses[e], e))
+    return [{"rank": rank, "entrant": e, "wins": wins[e], "losses": losses[e]} for rank, e in enumerate(order, start=1)]
@@ -1,5 +1,5 @@
-import { useState, useEffect, useCallback } from "react";
-import { api } from "../services/api";
+import { useState, useEffect, useCallback, useRef } from "react";
+import { api, spriteUrl, readServerSentEvents } from "../services/api";
 import PokemonCard from "../components/PokemonCard";
 
 function HealthBar({ currentHp, maxHp, name }) {
@@ -69,6 +69,10 @@ export default function Battle() {
   const [p1Stats, setP1Stats] = useState(null);
   const [p2Stats, setP2Stats] = useState(null);
   const [attacking, setAttacking] = useState(null); // 'p1' or 'p2'
+  const streamRef = useRef(null); // AbortController of the battle event stream
+
+  // Stop listening to a battle still in progress when leaving the page
+  useEffect(() => () => streamRef.current?.abort(), []);
 
   useEffect(() => {
     const fetchTeams = async () => {
@@ -128,23 +132,39 @@ export default function Battle() {
     setP1Stats(null);
     setP2Stats(null);
 
+    // The server pushes each turn as it is played and saves the battle at the end.
+    // Read with fetch rather than EventSource, which can't see why a battle was refused.
+    const params = new URLSearchParams({ pokemon1: pokemon1.pokemon.name, pokemon2: pokemon2.pokemon.name });
+    const controller = new AbortController();
+    streamRef.current = controller;
+    let ended = false;
+    const handlers = {
+      start: ({ log, p1_stats, p2_stats }) => {
+        setBattleLog((prev) => [...prev, ...log]);
+        setP1Stats({ ...p1_stats, maxHp: p1_stats.hp, image: spriteUrl(p1_stats.id) });
+        setP2Stats({ ...p2_stats, maxHp: p2_stats.hp, image: spriteUrl(p2_stats.id) });
+      },
+      turn: ({ log }) => setBattleLog((prev) => [...prev, ...log]),
+      end: (result) => {
+        ended = true;
+        setBattleResult(result);
+      },
+    };
+
     try {
-      const response = await api.post("/battle/", [pokemon1.pokemon.name, pokemon2.pokemon.name]);
-      const { log, p1_stats, p2_stats } = response.data;
-      
-      // Find which stats belong to which pokemon
-      if (p1_stats.name.toLowerCase() === pokemon1.pokemon.name.toLowerCase()) {
-        setP1Stats({ ...p1_stats, maxHp: p1_stats.hp, image: `https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/${p1_stats.id}.png` });
-        setP2Stats({ ...p2_stats, maxHp: p2_stats.hp, image: `https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/${p2_stats.id}.png` });
-      } else {
-        setP1Stats({ ...p2_stats, maxHp: p2_stats.hp, image: `https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/${p2_stats.id}.png` });
-        setP2Stats({ ...p1_stats, maxHp: p1_stats.hp, image: `https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/${p1_stats.id}.png` });
+      const response = await fetch(`${api.defaults.baseURL}/battle/stream?${params}`, {
+        credentials: "include",
+        headers: { Accept: "text/event-stream" },
+        signal: controller.signal,
+      });
+      if (!response.ok) {
+        const body = await response.json().catch(() => ({}));
+        throw new Error(typeof body.detail === "string" ? body.detail : "An error occurred during the battle.");
       }
-
-      setBattleLog(log);
-      setBattleResult(response.data);
+      await readServerSentEvents(response.body, (event, data) => handlers[event]?.(data));
+      if (!ended) throw new Error("The battle was interrupted.");
     } catch (err) {
-      setError(err.response?.data?.detail || "An error occurred during the battle.");
+      if (err.name !== "AbortError") setError(err.message || "An error occurred during the battle.");
     } finally {
       setIsLoading(false);
     }
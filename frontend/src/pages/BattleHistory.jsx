@@ -1,5 +1,5 @@
 import { useState, useEffect } from "react";
-import { api } from "../services/api";
+import { api, spriteUrl } from "../services/api";
 import BattleLogModal from "../components/BattleLogModal";
 
 export default function BattleHistory() {
@@ -8,6 +8,8 @@ export default function BattleHistory() {
   const [selectedLog, setSelectedLog] = useState(null);
   const [detailedLog, setDetailedLog] = useState(null);
   const [isModalLoading, setIsModalLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const handleLogClick = async (log) => {
     setSelectedLog(log);
@@ -27,23 +29,23 @@ export default function BattleHistory() {
         p1_stats = { 
           ...apiP1Stats, 
           maxHp: apiP1Stats.hp, 
-          image: `https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/${apiP1Stats.id}.png`
+          image: spriteUrl(apiP1Stats.id)
         };
         p2_stats = { 
           ...apiP2Stats, 
           maxHp: apiP2Stats.hp, 
-          image: `https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/${apiP2Stats.id}.png`
+          image: spriteUrl(apiP2Stats.id)
         };
       } else {
         p1_stats = { 
           ...apiP2Stats, 
           maxHp: apiP2Stats.hp, 
-          image: `https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/${apiP2Stats.id}.png`
+          image: spriteUrl(apiP2Stats.id)
         };
         p2_stats = { 
           ...apiP1Stats, 
           maxHp: apiP1Stats.hp, 
-          image: `https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/${apiP1Stats.id}.png`
+          image: spriteUrl(apiP1Stats.id)
         };
       }
 
@@ -56,11 +58,26 @@ export default function BattleHistory() {
     }
   };
 
+  // The history is paginated; the next page's cursor comes back in a header.
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await api.get("/battle/", { params: { cursor: nextCursor } });
+      setLogs(prev => [...prev, ...res.data]);
+      setNextCursor(res.headers["x-next-cursor"] || null);
+    } catch (err) {
+      console.error("Failed to fetch battle logs:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     const fetchLogs = async () => {
       try {
         const res = await api.get("/battle/");
         setLogs(res.data);
+        setNextCursor(res.headers["x-next-cursor"] || null);
       } catch (err) {
         console.error("Failed to fetch battle logs:", err);
       } finally {
@@ -103,6 +120,15 @@ export default function BattleHistory() {
               </div>
             </div>
           ))}
+          {nextCursor && (
+            <button
+              className="w-full py-2 border rounded-lg bg-white hover:bg-gray-50 disabled:opacity-50"
+              onClick={loadMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          )}
         </div>
       )}
       {selectedLog && (
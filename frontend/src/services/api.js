@@ -5,4 +5,30 @@ export const api = axios.create({
   withCredentials: true, // This is the key change
 });
 
+// Sprites are served by the backend's local cache
+export const spriteUrl = (id, kind = "artwork") => `${api.defaults.baseURL}/sprites/${kind}/${id}.png`;
+
+// Calls onEvent(event, data) for each server-sent event in a fetch response body, until it ends
+export const readServerSentEvents = async (body, onEvent) => {
+  const reader = body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += value;
+    let end;
+    while ((end = buffer.indexOf("\n\n")) !== -1) {
+      const message = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      let event = "message";
+      const data = [];
+      for (const line of message.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+      }
+      if (data.length) onEvent(event, JSON.parse(data.join("\n")));
+    }
+  }
+};
+
 export default api;
\ No newline at end of file